@@ -78,6 +78,41 @@ class Settings:
         self.DB_CURSOR_ARRAY_SIZE = int(os.getenv("DB_CURSOR_ARRAY_SIZE", "10000"))
         self.EXCEL_ROW_LIMIT = int(os.getenv("EXCEL_ROW_LIMIT", "1048576"))
         self.PREVIEW_SAMPLE_SIZE = int(os.getenv("PREVIEW_SAMPLE_SIZE", "100"))
+        # TDS network packet size in bytes (512-32767); 0 keeps the driver default of 4096
+        self.DB_PACKET_SIZE = int(os.getenv("DB_PACKET_SIZE", "0"))
+        
+        # Comma-separated import view columns to fetch (in order); empty selects every column
+        self.IMPORT_COLUMNS = [
+            column.strip()
+            for column in os.getenv("IMPORT_COLUMNS", "").split(",")
+            if column.strip()
+        ]
+        if len(set(self.IMPORT_COLUMNS)) != len(self.IMPORT_COLUMNS):
+            raise ValueError("IMPORT_COLUMNS must not list a column more than once")
+        
+        # Comma-separated view columns with few distinct values (ports, countries, ...)
+        # that are materialized as pandas categoricals to shrink each fetched batch
+        self.LOW_CARDINALITY_COLUMNS = {
+            column.strip()
+            for column in os.getenv("LOW_CARDINALITY_COLUMNS", "").split(",")
+            if column.strip()
+        }
+        
+        # Excel workbook memory mode: "constant" always streams rows to disk; "auto" builds the
+        # workbook in memory when the estimated size fits comfortably in available RAM (needs psutil)
+        self.EXCEL_MEMORY_MODE = os.getenv("EXCEL_MEMORY_MODE", "auto").lower()
+        
+        # Exports with more rows than this are written as Parquet instead of xlsx; 0 disables the switch
+        self.PARQUET_THRESHOLD = int(os.getenv("PARQUET_THRESHOLD", "0"))
+        self.PARQUET_COMPRESSION = os.getenv("PARQUET_COMPRESSION", "snappy").lower()
+        
+        # Fetch export rows as Arrow batches through arrow-odbc (needs the arrow-odbc package);
+        # the max text size (characters) bounds its per-column buffers, 0 uses the column size
+        self.USE_ARROW_ODBC = os.getenv("USE_ARROW_ODBC", "false").lower() == "true"
+        self.ARROW_ODBC_MAX_TEXT_SIZE = int(os.getenv("ARROW_ODBC_MAX_TEXT_SIZE", "0"))
+        
+        # Persistent Parquet cache of stored procedure results; 0 disables it
+        self.RESULT_CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", "0"))
         
         # Module-specific batch size overrides (optional)
         self.DB_BATCH_SIZE_IMPORT = int(os.getenv("DB_BATCH_SIZE_IMPORT", self.DB_FETCH_BATCH_SIZE))
@@ -88,6 +123,10 @@ class Settings:
         self.TEMP_DIR = self._resolve_path(os.getenv("TEMP_DIR", "./temp"))
         self.TEMPLATES_DIR = self._resolve_path(os.getenv("TEMPLATES_DIR", "./templates"))
         self.LOGS_DIR = self._resolve_path(os.getenv("LOGS_DIR", "./logs"))
+        self.RESULT_CACHE_DIR = self._resolve_path(os.getenv("RESULT_CACHE_DIR", "./cache"))
+        # Scratch space for xlsxwriter's streamed row data; point it at fast local storage
+        # (e.g. /dev/shm or a local SSD) to keep it off the disk the final files are written to
+        self.EXCEL_TMP_DIR = self._resolve_path(os.getenv("EXCEL_TMP_DIR", "")) or self.TEMP_DIR
         
         # Excel template settings
         self.EXCEL_TEMPLATE_PATH = self._resolve_path(
@@ -144,6 +183,8 @@ class Settings:
         os.makedirs(self.TEMP_DIR, exist_ok=True)
         os.makedirs(self.TEMPLATES_DIR, exist_ok=True)
         os.makedirs(self.LOGS_DIR, exist_ok=True)
+        os.makedirs(self.RESULT_CACHE_DIR, exist_ok=True)
+        os.makedirs(self.EXCEL_TMP_DIR, exist_ok=True)
 
 # Create an instance of the settings class
 settings = Settings()
\ No newline at end of file
@@ -1,27 +1,51 @@
 import pandas as pd
 import numpy as np
 import json
+from datetime import date, time
+from decimal import Decimal
 from typing import List, Dict, Any, Optional
 
+
 # Custom JSON encoder to handle pandas Timestamp objects
 class CustomJSONEncoder(json.JSONEncoder):
     def default(self, obj):
-        if hasattr(obj, 'isoformat'):
+        # NaT subclasses datetime too, but would encode as the string 'NaT'
+        if obj is pd.NaT:
+            return None
+        # date covers datetime and pandas Timestamp (both subclasses)
+        elif isinstance(obj, (date, time)):
             return obj.isoformat()
+        # SQL decimal/money columns (e.g. from the Parquet result cache)
+        elif isinstance(obj, Decimal):
+            return float(obj)
         elif pd.isna(obj):
             return None
         return super().default(obj)
 
+
 def process_dataframe_for_json(df):
     """Process a DataFrame to make it suitable for JSON serialization"""
-    # Convert all timestamps to strings in ISO format
+    # Convert all timestamps to strings in ISO format (YYYY-MM-DDTHH:MM:SS) with NumPy's
+    # vectorized formatter; NaT becomes None
     for col in df.select_dtypes(include=['datetime64']).columns:
-        df[col] = df[col].dt.strftime('%Y-%m-%dT%H:%M:%S')
+        iso = np.datetime_as_string(df[col].to_numpy(dtype='datetime64[s]'), unit='s')
+        df[col] = pd.Series(iso, index=df.index, dtype=object).where(df[col].notna(), None)
     
-    # Replace NaN values with None for JSON serialization
-    df = df.replace({np.nan: None})
+    # Replace NaN values with None for JSON serialization. Only the columns that hold
+    # nulls are converted to object; json.dumps writes float NaN as-is, so the encoder can't do it
+    for col in df.columns[df.isna().any().to_numpy()]:
+        df[col] = df[col].astype(object).where(df[col].notna(), None)
     
     # Convert to records
     result = df.to_dict('records')
     
-    return result
\ No newline at end of file
+    return result
+
+
+def column_text_widths(df):
+    """Get the longest text length in each DataFrame column, computed per column rather than per cell"""
+    if df.empty:
+        return [0] * df.shape[1]
+    # Nulls are written as blank cells, so they count as zero width
+    lengths = df.astype(str).apply(lambda column: column.str.len()).where(df.notna(), 0)
+    return lengths.max(axis=0).astype(int).tolist()
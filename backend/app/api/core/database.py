@@ -2,6 +2,8 @@ import pyodbc
 import pandas as pd
 from typing import List, Dict, Any, Optional
 from contextlib import contextmanager
+import queue
+import threading
 import uuid
 from .config import settings
 from .logger import db_logger, log_execution_time, mask_sensitive_data
@@ -43,6 +45,14 @@ def db_log_error(message: str, exc_info: bool = False, **kwargs):
     """Enhanced database error logging with emojis"""
     db_logger.error(f"❌ {message}", extra=kwargs, exc_info=exc_info)
 
+# ODBC connection attribute for the TDS packet size; it only takes effect when set before connecting
+SQL_ATTR_PACKET_SIZE = 112
+_ATTRS_BEFORE = {SQL_ATTR_PACKET_SIZE: settings.DB_PACKET_SIZE} if settings.DB_PACKET_SIZE > 0 else {}
+
+def quote_ident(name: str) -> str:
+    """Quote a SQL Server identifier with brackets, escaping any closing bracket"""
+    return "[" + str(name).replace("]", "]]") + "]"
+
 def create_connection_string(server: str, database: str, username: str, password: str) -> str:
     """Create a connection string for SQL Server"""
     # Convert server and database to strings if they aren't already
@@ -112,7 +122,9 @@ def get_db_connection(server: str, database: str, username: str, password: str):
     connection_string = create_connection_string(server, database, username, password)
     conn = None
     try:
-        conn = pyodbc.connect(connection_string)
+        conn = pyodbc.connect(connection_string, attrs_before=_ATTRS_BEFORE)
+        # Suppress "rows affected" messages once for the whole session
+        conn.execute("SET NOCOUNT ON").close()
         db_log_debug(
             f"Database connection established [ID: {connection_id}]",
             connection_id=connection_id, 
@@ -139,6 +151,72 @@ def get_db_connection(server: str, database: str, username: str, password: str):
                 operation="connection_close"
             )
 
+@contextmanager
+def get_cursor(conn, cursor=None):
+    """Yield the given cursor, or open a short-lived one on conn and close it afterwards.
+
+    Lets helpers that are called back-to-back share one ODBC statement handle
+    instead of allocating a new cursor per call.
+    """
+    if cursor is not None:
+        yield cursor
+        return
+    
+    own_cursor = conn.cursor()
+    try:
+        yield own_cursor
+    finally:
+        own_cursor.close()
+
+# Row batches a prefetch thread may read ahead of its consumer
+PREFETCH_DEPTH = 2
+
+def start_row_prefetch(cursor, operation_id, batch_size, max_rows=None):
+    """Fetch row batches on a background thread so database reads overlap the consumer's work
+    
+    pyodbc releases the GIL while fetching. Returns (rows_queue, stop_event, thread): the queue
+    yields lists of at most batch_size rows (max_rows in total, if given), then None once fetching
+    ends or the operation is cancelled; an exception raised while fetching is queued in place of
+    a batch. Set stop_event and join the thread before closing the cursor.
+    """
+    # Import here to avoid circular imports
+    from .operation_tracker import is_operation_cancelled
+    
+    rows_queue = queue.Queue(maxsize=PREFETCH_DEPTH)
+    stop_event = threading.Event()
+    
+    def put(item):
+        # Block while the queue is full, but give up once the consumer has gone away
+        while not stop_event.is_set():
+            try:
+                rows_queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def producer():
+        fetched = 0
+        try:
+            while (max_rows is None or fetched < max_rows) and not stop_event.is_set():
+                if is_operation_cancelled(operation_id):
+                    break
+                size = batch_size if max_rows is None else min(batch_size, max_rows - fetched)
+                rows = cursor.fetchmany(size)
+                if not rows:
+                    break
+                fetched += len(rows)
+                if not put(rows):
+                    return
+        except Exception as e:
+            put(e)
+            return
+        put(None)
+    
+    thread = threading.Thread(target=producer, name=f"prefetch-{operation_id}", daemon=True)
+    thread.start()
+    return rows_queue, stop_event, thread
+
 @log_execution_time
 def execute_stored_procedure(conn, procedure_name: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
     """Execute a stored procedure and return results as a list of dictionaries"""
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal
 from datetime import datetime
 
 # Login request model
@@ -33,6 +33,7 @@ class ExportParameters(BaseModel):
     max_records: int = Field(100, description="Maximum number of records to return for preview")
     force_continue_despite_limit: bool = Field(False, description="If true, export will continue even if record count exceeds Excel limit")
     selectedView: Optional[str] = Field(None, description="Selected view for data extraction")
+    export_format: Literal["xlsx", "parquet", "csv"] = Field("xlsx", description="Output format: 'xlsx', 'parquet' or 'csv' (gzip-compressed); the latter two have no row limit and are much faster for large exports")
 
 # Import parameters model based on the stored procedure parameters
 class ImportParameters(BaseModel):
@@ -125,6 +125,20 @@ def get_operation_details(operation_id: str) -> Optional[Dict[str, Any]]:
         return None
 
 
+def cache_total_count(operation_id: str, total_count: int) -> None:
+    """Store the operation's total row count so later fetches can skip the COUNT query"""
+    with _operations_lock:
+        if operation_id in _active_operations:
+            _active_operations[operation_id]["total_count"] = total_count
+
+
+def set_operation_detail(operation_id: str, key: str, value: Any) -> None:
+    """Attach a custom metadata value to an operation"""
+    with _operations_lock:
+        if operation_id in _active_operations:
+            _active_operations[operation_id][key] = value
+
+
 def update_operation_progress(operation_id: str, current: int, total: int) -> None:
     """Update the progress of an operation"""
     with _operations_lock:
@@ -0,0 +1,127 @@
+import os
+import time
+import uuid
+from typing import Iterator, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; the result cache is disabled without it
+    pa = None
+    pq = None
+
+from .config import settings
+from .logger import db_logger
+
+# Disk-backed cache of stored procedure result sets.
+# Each result is a Parquet file named by a caller-supplied key (parameter fingerprint,
+# view and column selection), so it survives API restarts. Files are written to a
+# temporary name and renamed into place only once the complete result has been spooled.
+
+
+def is_enabled() -> bool:
+    """Check whether the result cache is configured (RESULT_CACHE_TTL_SECONDS > 0) and usable"""
+    return pq is not None and settings.RESULT_CACHE_TTL_SECONDS > 0
+
+
+def cache_path(key: str) -> str:
+    """Get the Parquet file path for a cache key"""
+    return os.path.join(settings.RESULT_CACHE_DIR, f"{key}.parquet")
+
+
+def get_cached_result(key: str) -> Optional[str]:
+    """Return the path of a cached result that is younger than the TTL, or None"""
+    if not is_enabled():
+        return None
+
+    path = cache_path(key)
+    try:
+        age = time.time() - os.path.getmtime(path)
+    except OSError:
+        return None
+
+    if age >= settings.RESULT_CACHE_TTL_SECONDS:
+        return None
+    return path
+
+
+def cached_row_count(path: str) -> int:
+    """Get the number of rows in a cached result from the Parquet footer"""
+    return pq.ParquetFile(path).metadata.num_rows
+
+
+def cached_columns(path: str) -> List[str]:
+    """Get the column names of a cached result"""
+    return pq.ParquetFile(path).schema_arrow.names
+
+
+def iter_cached_batches(path: str, batch_size: int, max_rows: Optional[int] = None) -> Iterator["pa.RecordBatch"]:
+    """Stream RecordBatches from a cached result, stopping after max_rows rows"""
+    remaining = max_rows
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+        if remaining is not None:
+            if remaining <= 0:
+                break
+            if batch.num_rows > remaining:
+                batch = batch.slice(0, remaining)
+            remaining -= batch.num_rows
+        yield batch
+
+
+def read_top_rows(path: str, limit: int, batch_size: int = 65536) -> "pa.Table":
+    """Read the first `limit` rows of a cached result, in the order they were written"""
+    parquet_file = pq.ParquetFile(path)
+    batches = list(iter_cached_batches(path, batch_size, limit))
+    return pa.Table.from_batches(batches, schema=parquet_file.schema_arrow)
+
+
+def purge_expired() -> int:
+    """Remove cached results (and abandoned spool files) older than twice the TTL
+
+    The grace period keeps files that an in-flight operation resolved just before expiry.
+    """
+    cutoff = time.time() - 2 * settings.RESULT_CACHE_TTL_SECONDS
+    removed = 0
+    for name in os.listdir(settings.RESULT_CACHE_DIR):
+        path = os.path.join(settings.RESULT_CACHE_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+
+    if removed:
+        db_logger.info(f"Removed {removed} expired cached result files")
+    return removed
+
+
+class ResultSpool:
+    """Write a result set to the cache batch by batch; it only becomes visible on commit()"""
+
+    def __init__(self, key: str, schema: "pa.Schema"):
+        self.path = cache_path(key)
+        self._tmp_path = f"{self.path}.{uuid.uuid4().hex[:8]}.tmp"
+        self._writer = pq.ParquetWriter(self._tmp_path, schema)
+
+    def write(self, batch: "pa.RecordBatch") -> None:
+        """Append one batch to the spool file"""
+        self._writer.write_batch(batch)
+
+    def commit(self) -> None:
+        """Finish the file and atomically publish it under the cache key"""
+        self._writer.close()
+        os.replace(self._tmp_path, self.path)
+        db_logger.info(f"💾 Cached result written to {self.path}")
+        purge_expired()
+
+    def abort(self) -> None:
+        """Discard a partially written spool file"""
+        try:
+            self._writer.close()
+        except Exception:
+            pass
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
@@ -1,49 +1,64 @@
-import pandas as pd
-import numpy as np
+import pyodbc
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+from collections import OrderedDict
+import hashlib
+import logging
 import threading
+import time
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow is optional; batches are then built with pandas only
+    pa = None
+
+try:
+    from arrow_odbc import read_arrow_batches_from_odbc
+except ImportError:  # arrow-odbc is optional; exports then fetch through pyodbc
+    read_arrow_batches_from_odbc = None
 
 from ..core.config import settings
-from ..core.database import get_db_connection, execute_query, query_to_dataframe
+from ..core.database import (
+    get_db_connection, get_cursor, execute_query, query_to_dataframe, start_row_prefetch, create_connection_string
+)
 from ..core.logger import db_logger, log_execution_time, mask_sensitive_data
 
-# Cache to store the last executed query parameters and timestamp
-_query_cache = {
-    "params": None,
-    "timestamp": None,
-    "record_count": 0
-}
+# LRU cache of stored procedure results keyed by parameter fingerprint.
+# Each entry holds {"timestamp", "record_count", "staged"}. The procedure fills one shared
+# temp table, so only the entry whose rows are currently staged can skip re-execution.
+_query_cache: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+_CACHE_MAX = 8
 
-# Lock for thread-safe operations
-_operations_lock = threading.Lock()
+# Lock for thread-safe access to the module-level cache
+_cache_lock = threading.Lock()
 
-def _params_match(cached_params, new_params):
-    """Compare two sets of parameters to determine if they match"""
-    if not cached_params:
-        return False
-        
-    # Compare essential filter parameters
-    key_params = [
-        "fromMonth", "ToMonth", "hs", "prod", "Iec",
-        "ExpCmp", "forcount", "forname", "port"
-    ]
-    
-    for key in key_params:
-        if getattr(cached_params, key, None) != getattr(new_params, key, None):
-            return False
-    
-    return True
+# Views known to hold populated temp data, mapped to a time.monotonic() deadline.
+# Until the deadline passes the SELECT TOP 1 probe is skipped on cache hits.
+_TEMP_TABLE_TTL_SECONDS = 60
+_temp_table_seen_until: Dict[str, float] = {}
+
+# Fixed binding sizes for the stored procedure parameters (two YYYYMM ints, seven filters)
+# so every call is prepared with the same signature and the server plan can be reused
+_SP_INPUT_SIZES = [(pyodbc.SQL_INTEGER, 0, 0)] * 2 + [(pyodbc.SQL_WVARCHAR, 4000, 0)] * 7
+
+# Emit one aggregated INFO progress log every N batches; per-batch detail is DEBUG only
+_BATCH_LOG_INTERVAL = 10
 
-def _check_temp_table_exists(conn, view_name=None):
+def _params_fingerprint(params):
+    """Hash the essential filter parameters into a 64-bit integer cache key"""
+    key = (
+        params.fromMonth, params.toMonth, params.hs, params.prod, params.iec,
+        params.expCmp, params.forcount, params.forname, params.port
+    )
+    return int.from_bytes(hashlib.blake2b(repr(key).encode(), digest_size=8).digest(), "big")
+
+def _check_temp_table_exists(conn, view_name=None, cursor=None):
     """Check if the temporary table exists and has data"""
     view_to_check = view_name or settings.EXPORT_VIEW
     try:
-        cursor = conn.cursor()
-        cursor.execute(f"SELECT TOP 1 * FROM {view_to_check}")
-        has_data = cursor.fetchone() is not None
-        cursor.close()
-        return has_data
+        with get_cursor(conn, cursor) as cur:
+            cur.execute(f"SELECT TOP 1 * FROM {view_to_check}")
+            return cur.fetchone() is not None
     except Exception:
         return False
 
@@ -79,78 +94,94 @@ def execute_export_procedure(conn, params, operation_id):
         "port": params.port or ""
     }
     
-    # Determine which view to use
-    selected_view_key = params.selectedView or "EXPORT_VIEW_1"
-    selected_view = settings.EXPORT_VIEWS.get(selected_view_key, {}).get("value", settings.EXPORT_VIEW)
-    
-    # Check if we need to re-execute the stored procedure
-    cache_valid = _params_match(_query_cache["params"], params) and _check_temp_table_exists(conn, selected_view)
-    
-    if not cache_valid:
-        db_logger.info(
-            f"[{operation_id}] Cache miss or invalid, executing stored procedure",
-            extra={
-                "operation_id": operation_id,
-                "cached": False,
-                "sp_params": mask_sensitive_data(sp_params)
-            }
-        )
+    # One cursor serves the cache check, the stored procedure and the count query
+    with get_cursor(conn) as cursor:
+        # Check if we need to re-execute the stored procedure
+        fingerprint = _params_fingerprint(params)
+        with _cache_lock:
+            cache_entry = _query_cache.get(fingerprint)
+            cache_valid = cache_entry is not None and cache_entry["staged"]
+            if cache_valid:
+                _query_cache.move_to_end(fingerprint)
+            seen_until = _temp_table_seen_until.get(selected_view, 0)
+        if cache_valid and time.monotonic() >= seen_until:
+            cache_valid = _check_temp_table_exists(conn, selected_view, cursor)
+            if cache_valid:
+                with _cache_lock:
+                    _temp_table_seen_until[selected_view] = time.monotonic() + _TEMP_TABLE_TTL_SECONDS
+    
+        if not cache_valid:
+            db_logger.info(
+                f"[{operation_id}] Cache miss or invalid, executing stored procedure",
+                extra={
+                    "operation_id": operation_id,
+                    "cached": False,
+                    "sp_params": mask_sensitive_data(sp_params)
+                }
+            )
         
-        sp_start_time = datetime.now()
+            sp_start_time = datetime.now()
         
-        # Execute the stored procedure to populate the temp table
-        param_list = list(sp_params.values())
-        sp_call = f"EXEC {settings.EXPORT_STORED_PROCEDURE} ?, ?, ?, ?, ?, ?, ?, ?, ?"
+            # Execute the stored procedure to populate the temp table
+            param_list = list(sp_params.values())
+            sp_call = "{CALL " + settings.EXPORT_STORED_PROCEDURE + "(?, ?, ?, ?, ?, ?, ?, ?, ?)}"
         
-        db_logger.debug(f"[{operation_id}] Executing stored procedure: {sp_call}", extra={"operation_id": operation_id})
+            db_logger.debug(f"[{operation_id}] Executing stored procedure: {sp_call}", extra={"operation_id": operation_id})
         
-        # Use cursor directly for executing stored procedure
-        cursor = conn.cursor()
-        cursor.execute(sp_call, param_list)
-        conn.commit()
-        cursor.close()
+            # Use the ODBC call escape with fixed input sizes so the driver can reuse the prepared plan
+            cursor.setinputsizes(_SP_INPUT_SIZES)
+            cursor.execute(sp_call, param_list)
+            cursor.setinputsizes(None)
+            conn.commit()
         
-        sp_execution_time = (datetime.now() - sp_start_time).total_seconds()
-        db_logger.info(
-            f"[{operation_id}] Stored procedure executed in {sp_execution_time:.2f} seconds",
-            extra={
-                "operation_id": operation_id,
-                "execution_time": sp_execution_time,
-                "procedure": settings.EXPORT_STORED_PROCEDURE
-            }
-        )
+            sp_execution_time = (datetime.now() - sp_start_time).total_seconds()
+            db_logger.info(
+                f"[{operation_id}] Stored procedure executed in {sp_execution_time:.2f} seconds",
+                extra={
+                    "operation_id": operation_id,
+                    "execution_time": sp_execution_time,
+                    "procedure": settings.EXPORT_STORED_PROCEDURE
+                }
+            )
         
-        # Update the cache
-        _query_cache["params"] = params
-        _query_cache["timestamp"] = datetime.now()
+            # Get the total record count for the cache
+            cursor.execute(f"SELECT COUNT(*) FROM {selected_view}")
+            record_count = cursor.fetchone()[0]
         
-        # Get the total record count for the cache
-        count_cursor = conn.cursor()
-        count_cursor.execute(f"SELECT COUNT(*) FROM {settings.EXPORT_VIEW}")
-        record_count = count_cursor.fetchone()[0]
-        _query_cache["record_count"] = record_count
-        count_cursor.close()
+            # Update the cache; the temp table now holds this fingerprint's rows only
+            with _cache_lock:
+                for entry in _query_cache.values():
+                    entry["staged"] = False
+                _query_cache[fingerprint] = {
+                    "timestamp": datetime.now(),
+                    "record_count": record_count,
+                    "staged": True
+                }
+                _query_cache.move_to_end(fingerprint)
+                if len(_query_cache) > _CACHE_MAX:
+                    _query_cache.popitem(last=False)
+                _temp_table_seen_until[selected_view] = time.monotonic() + _TEMP_TABLE_TTL_SECONDS
         
-        db_logger.info(
-            f"[{operation_id}] Total records found: {record_count}",
-            extra={
-                "operation_id": operation_id,
-                "record_count": record_count
-            }
-        )
+            db_logger.info(
+                f"[{operation_id}] Total records found: {record_count}",
+                extra={
+                    "operation_id": operation_id,
+                    "record_count": record_count
+                }
+            )
         
-        return record_count, False  # Return record count and cache status
-    else:
-        db_logger.info(
-            f"[{operation_id}] Using cached data. Last query timestamp: {_query_cache['timestamp']}",
-            extra={
-                "operation_id": operation_id,
-                "cached": True,
-                "cache_timestamp": _query_cache['timestamp'].isoformat() if isinstance(_query_cache['timestamp'], datetime) else str(_query_cache['timestamp']),
-                "record_count": _query_cache["record_count"]
-            }
-        )
-        return _query_cache["record_count"], True  # Return cached record count and cache status
+            return record_count, False  # Return record count and cache status
+        else:
+            db_logger.info(
+                f"[{operation_id}] Using cached data. Last query timestamp: {cache_entry['timestamp']}",
+                extra={
+                    "operation_id": operation_id,
+                    "cached": True,
+                    "cache_timestamp": cache_entry['timestamp'].isoformat(),
+                    "record_count": cache_entry["record_count"]
+                }
+            )
+            return cache_entry["record_count"], True  # Return cached record count and cache status
 
 @log_execution_time
 def get_preview_data(conn, params, operation_id):
@@ -195,41 +226,7 @@ def get_preview_data(conn, params, operation_id):
     
     return df
 
-def get_first_row_hs_code(conn, operation_id=None, view_name=None):
-    """Get the first row's HS code for the filename"""
-    # Check for cancellation if operation_id is provided
-    if operation_id:
-        # Import here to avoid circular imports
-        from ..core.operation_tracker import is_operation_cancelled
-        if is_operation_cancelled(operation_id):
-            db_logger.info(f"[{operation_id}] Operation cancelled before getting HS code")
-            raise Exception("Operation cancelled by user")
-    
-    view_to_query = view_name or settings.EXPORT_VIEW
-    hs_code_query = f"SELECT TOP 1 [Hs_Code] FROM {view_to_query}"
-    cursor = conn.cursor()
-    cursor.execute(hs_code_query)
-    first_row_hs = cursor.fetchone()
-    cursor.close()
-    return first_row_hs
-
-def get_column_headers(conn, operation_id=None):
-    """Get column headers from the export view"""
-    # Check for cancellation if operation_id is provided
-    if operation_id:
-        # Import here to avoid circular imports
-        from ..core.operation_tracker import is_operation_cancelled
-        if is_operation_cancelled(operation_id):
-            db_logger.info(f"[{operation_id}] Operation cancelled before getting column headers")
-            raise Exception("Operation cancelled by user")
-    
-    cursor = conn.cursor()
-    cursor.execute(f"SELECT TOP 1 * FROM {settings.EXPORT_VIEW}")
-    columns = [column[0] for column in cursor.description]
-    cursor.close()
-    return columns
-
-def get_total_row_count(conn, operation_id=None, view_name=None):
+def get_total_row_count(conn, operation_id=None, view_name=None, cursor=None):
     """Get the total row count from the export view"""
     # Check for cancellation if operation_id is provided
     if operation_id:
@@ -240,41 +237,80 @@ def get_total_row_count(conn, operation_id=None, view_name=None):
             raise Exception("Operation cancelled by user")
     
     view_to_query = view_name or settings.EXPORT_VIEW
-    count_cursor = conn.cursor()
-    count_cursor.execute(f"SELECT COUNT(*) FROM {view_to_query}")
-    total_count = count_cursor.fetchone()[0]
-    count_cursor.close()
+    with get_cursor(conn, cursor) as cur:
+        cur.execute(f"SELECT COUNT(*) FROM {view_to_query}")
+        total_count = cur.fetchone()[0]
     return total_count
 
-def fetch_data_in_chunks(conn, chunk_size, offset, operation_id):
-    """
-    DEPRECATED: Old offset-based method - use fetch_data_in_chunks_export instead
-    Kept for backward compatibility only
+def _rows_to_dataframe(rows, columns):
+    """Convert fetched rows to a DataFrame via Arrow, one pandas block per column"""
+    # pandas is only needed here, so keep it off the module import path
+    import pandas as pd
+    
+    if pa is not None and rows:
+        try:
+            arrays = [pa.array(column_values, from_pandas=True) for column_values in zip(*rows)]
+            table = pa.Table.from_arrays(arrays, names=columns)
+            # self_destruct frees each Arrow buffer as pandas takes it over, so the batch is never held twice
+            return table.to_pandas(split_blocks=True, self_destruct=True)
+        except (pa.ArrowException, TypeError):
+            # Column values Arrow cannot type (e.g. mixed objects) - fall back to pandas
+            pass
+    return pd.DataFrame.from_records(rows, columns=columns)
+
+def _fetch_arrow_odbc_chunks(params, query, operation_id, batch_size, rows_to_fetch):
+    """Stream the export query as Arrow batches bound by arrow-odbc and yield them as DataFrames
+    
+    arrow-odbc opens its own connection and fills whole columnar row sets per driver call,
+    so no Python object is created per fetched cell.
     """
     # Import here to avoid circular imports
     from ..core.operation_tracker import is_operation_cancelled
     
-    # Check if operation has been cancelled before executing query
-    if is_operation_cancelled(operation_id):
-        db_logger.info(f"[{operation_id}] Operation cancelled before fetching chunk at offset {offset}")
-        raise Exception("Operation cancelled by user")
-        
-    query = f"SELECT * FROM {settings.EXPORT_VIEW} ORDER BY (SELECT NULL) OFFSET {offset} ROWS FETCH NEXT {chunk_size} ROWS ONLY"
+    connection_string = create_connection_string(params.server, params.database, params.username, params.password)
+    reader = read_arrow_batches_from_odbc(
+        query=query,
+        connection_string=connection_string,
+        batch_size=batch_size,
+        max_text_size=settings.ARROW_ODBC_MAX_TEXT_SIZE or None
+    )
+    low_cardinality_columns = settings.LOW_CARDINALITY_COLUMNS.intersection(reader.schema.names)
     
-    # Use cursor with optimized fetch size
-    cursor = conn.cursor()
-    cursor.execute(query)
-    # Set cursor options for better performance - now configurable
-    cursor.arraysize = settings.DB_CURSOR_ARRAY_SIZE  # Configurable batch size for better performance
-    cursor.fast_executemany = True
+    remaining = rows_to_fetch
+    if remaining <= 0:
+        # Nothing to read; still hand back the column names
+        yield reader.schema.empty_table().to_pandas()
+        return
     
-    return cursor
+    for batch_num, batch in enumerate(reader, 1):
+        if is_operation_cancelled(operation_id):
+            db_logger.info(f"[{operation_id}] Data fetch cancelled during batch {batch_num}")
+            raise Exception("Operation cancelled by user")
+        
+        if batch.num_rows > remaining:
+            batch = batch.slice(0, remaining)
+        df = batch.to_pandas(split_blocks=True)
+        for column in low_cardinality_columns:
+            df[column] = df[column].astype("category")
+        
+        remaining -= len(df)
+        yield df
+        if remaining <= 0:
+            break
+    
+    # The view turned out empty; still hand back the column names
+    if remaining == rows_to_fetch:
+        yield reader.schema.empty_table().to_pandas()
 
 @log_execution_time
-def fetch_data_in_chunks_export(conn, operation_id, batch_size=None, params=None):
-    """Fetch data in chunks to avoid memory issues - using optimized cursor-based approach like the import system"""
+def fetch_data_in_chunks_export(conn, operation_id, batch_size=None, params=None, excel_limit=True):
+    """Fetch data in chunks to avoid memory issues - using optimized cursor-based approach like the import system
+    
+    With excel_limit=False (Parquet/CSV output) the fetch is not capped at the Excel row limit.
+    An empty result yields one empty DataFrame that carries the view's columns.
+    """
     # Import here to avoid circular imports
-    from ..core.operation_tracker import is_operation_cancelled, get_operation_details
+    from ..core.operation_tracker import is_operation_cancelled, get_operation_details, cache_total_count
     
     if batch_size is None:
         batch_size = settings.get_batch_size('export')
@@ -293,12 +329,10 @@ def fetch_data_in_chunks_export(conn, operation_id, batch_size=None, params=None
     if total_count is None:
         total_count = get_total_row_count(conn, operation_id, selected_view)
         # Cache it if we had to look it up
-        if operation_details:
-            with _operations_lock:
-                operation_details['total_count'] = total_count
+        cache_total_count(operation_id, total_count)
     
     # Check if we need to limit the number of rows due to Excel row limit
-    excel_row_limit = settings.get_excel_row_limit()
+    excel_row_limit = settings.get_excel_row_limit() if excel_limit else total_count
     
     # Check operation details for max_rows override (e.g., user confirmed Excel limit)
     max_rows = operation_details.get('max_rows', excel_row_limit) if operation_details else excel_row_limit
@@ -345,66 +379,108 @@ def fetch_data_in_chunks_export(conn, operation_id, batch_size=None, params=None
         }
     )
     
-    # Set up cursor with optimized fetch settings
+    # Columnar fetch through arrow-odbc when it is enabled and installed
+    if settings.USE_ARROW_ODBC and read_arrow_batches_from_odbc is not None and params is not None:
+        yield from _fetch_arrow_odbc_chunks(params, query, operation_id, batch_size, rows_to_fetch)
+        return
+    
+    # Set up cursor with optimized fetch settings; size the fetch buffer before the statement runs
     cursor = conn.cursor()
-    cursor.execute(query)
-    # Set cursor options for better performance - now configurable
     cursor.arraysize = settings.DB_CURSOR_ARRAY_SIZE  # Configurable batch size for better performance
+    cursor.execute(query)
     
+    prefetch_thread = None
     try:
         # Process data in batches using cursor-based approach
         rows_processed = 0
         batch_num = 0
+        cumulative_time = 0.0
+        debug_enabled = db_logger.isEnabledFor(logging.DEBUG)
         
-        while rows_processed < rows_to_fetch:
+        # The column set cannot change between fetches from the same cursor
+        columns = [column[0] for column in cursor.description]
+        low_cardinality_columns = settings.LOW_CARDINALITY_COLUMNS.intersection(columns)
+        
+        # Read ahead on a background thread so the next batch is fetched while the caller writes this one
+        rows_queue, prefetch_stop, prefetch_thread = start_row_prefetch(cursor, operation_id, batch_size, rows_to_fetch)
+        
+        while True:
             # Check if operation has been cancelled
             if is_operation_cancelled(operation_id):
                 db_logger.info(f"[{operation_id}] Data fetch cancelled during batch {batch_num + 1}/{num_batches}")
                 raise Exception("Operation cancelled by user")
             
-            # Calculate how many rows we should fetch in this batch
-            current_batch_size = min(batch_size, rows_to_fetch - rows_processed)
-            if current_batch_size <= 0:
-                break
-            
             batch_num += 1
             
-            db_logger.debug(
-                f"[{operation_id}] Fetching batch {batch_num}/{num_batches}",
-                extra={
-                    "operation_id": operation_id,
-                    "batch_num": batch_num,
-                    "rows_processed": rows_processed
-                }
-            )
+            if debug_enabled:
+                db_logger.debug(
+                    f"[{operation_id}] Fetching batch {batch_num}/{num_batches}",
+                    extra={
+                        "operation_id": operation_id,
+                        "batch_num": batch_num,
+                        "rows_processed": rows_processed
+                    }
+                )
             
-            # Fetch the batch from cursor
+            # Take the next prefetched batch
             start_time = datetime.now()
-            rows = cursor.fetchmany(current_batch_size)
+            rows = rows_queue.get()
             
-            # If no rows returned, we're done
-            if not rows:
+            # None marks the end of the data (or a cancellation seen by the fetch thread)
+            if rows is None:
+                if is_operation_cancelled(operation_id):
+                    db_logger.info(f"[{operation_id}] Data fetch cancelled during batch {batch_num}/{num_batches}")
+                    raise Exception("Operation cancelled by user")
                 break
+            if isinstance(rows, Exception):
+                raise rows
                 
             # Convert to DataFrame
-            columns = [column[0] for column in cursor.description]
-            df = pd.DataFrame.from_records(rows, columns=columns)
+            df = _rows_to_dataframe(rows, columns)
+            
+            # Store repetitive text columns as categoricals (codes + one copy of each value)
+            for column in low_cardinality_columns:
+                df[column] = df[column].astype("category")
             
             execution_time = (datetime.now() - start_time).total_seconds()
             rows_processed += len(df)
+            cumulative_time += execution_time
             
-            # Log batch fetch
-            db_logger.info(
-                f"[{operation_id}] Batch {batch_num}/{num_batches} fetched in {execution_time:.2f} seconds, returned {len(df)} rows",
-                extra={
-                    "operation_id": operation_id,
-                    "batch_num": batch_num,
-                    "execution_time": execution_time,
-                    "row_count": len(df)
-                }
-            )
+            # Per-batch detail only at DEBUG to keep logging I/O out of the fetch loop
+            if debug_enabled:
+                db_logger.debug(
+                    f"[{operation_id}] Batch {batch_num}/{num_batches} fetched in {execution_time:.2f} seconds, returned {len(df)} rows",
+                    extra={
+                        "operation_id": operation_id,
+                        "batch_num": batch_num,
+                        "execution_time": execution_time,
+                        "row_count": len(df)
+                    }
+                )
+            
+            # Aggregated progress at INFO every few batches and on the last one
+            if batch_num % _BATCH_LOG_INTERVAL == 0 or batch_num == num_batches:
+                db_logger.info(
+                    f"[{operation_id}] Fetched {rows_processed}/{rows_to_fetch} rows in {batch_num}/{num_batches} batches ({cumulative_time:.2f} seconds)",
+                    extra={
+                        "operation_id": operation_id,
+                        "batch_num": batch_num,
+                        "rows_processed": rows_processed,
+                        "rows_to_fetch": rows_to_fetch,
+                        "execution_time": cumulative_time
+                    }
+                )
             
             yield df
+        
+        # An empty result still yields its column names, so callers need no header query
+        if rows_processed == 0:
+            yield _rows_to_dataframe([], columns)
     finally:
+        # Stop the fetch thread before the cursor it reads from is closed
+        if prefetch_thread is not None:
+            prefetch_stop.set()
+            prefetch_thread.join()
+        
         # Always close the cursor
         cursor.close()
\ No newline at end of file
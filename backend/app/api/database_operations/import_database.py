@@ -1,36 +1,116 @@
 # Import-specific database operations
 import pandas as pd
 import numpy as np
+import pyodbc
 from typing import List, Dict, Any, Optional
-from datetime import datetime
+from collections import OrderedDict
+from datetime import date, datetime, time
+from decimal import Decimal
+import hashlib
+import logging
+import threading
+from time import perf_counter_ns
 
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow is optional; batches are then built with pandas only
+    pa = None
+
+from ..core import result_cache
 from ..core.config import settings
-from ..core.database import get_db_connection, execute_query, query_to_dataframe
+from ..core.database import get_db_connection, execute_query, query_to_dataframe, quote_ident, start_row_prefetch
 from ..core.logger import import_logger, log_execution_time, mask_sensitive_data
 
-# Cache to store the last executed query parameters and timestamp
-_query_cache = {
-    "params": None,
-    "timestamp": None,
-    "record_count": 0
-}
+# LRU cache of stored procedure results keyed by parameter fingerprint.
+# Each entry holds {"timestamp", "record_count", "staged"}. The procedure fills one shared
+# staging table, so only the entry whose rows are currently staged can skip re-execution;
+# the others keep their record counts until evicted.
+_query_cache: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+_CACHE_MAX = 8
 
-def _params_match(cached_params, new_params):
-    """Compare two sets of parameters to determine if they match"""
-    if not cached_params:
-        return False
-        
-    # Compare essential filter parameters
-    key_params = [
-        "fromMonth", "ToMonth", "hs", "prod", "Iec",
-        "impCmp", "forcount", "forname", "port"
-    ]
+# View name -> datetime the view was last known to hold populated temp data
+_temp_table_verified_at: Dict[str, datetime] = {}
+
+# Columns fetched from the import view when a caller does not pass its own list (empty = all)
+DEFAULT_IMPORT_COLUMNS = settings.IMPORT_COLUMNS
+
+# View name -> the view's full column list, read once per process
+_view_columns: Dict[str, List[str]] = {}
+
+# How long a populated temp table is trusted before it is probed again
+_TEMP_TABLE_TTL_SECONDS = 300
+
+# Lock for thread-safe access to the module-level cache
+_cache_lock = threading.Lock()
+
+# Stored procedure call, built once; the ODBC call escape lets the driver reuse the statement handle
+_SP_CALL = "{CALL " + settings.IMPORT_STORED_PROCEDURE + "(?, ?, ?, ?, ?, ?, ?, ?, ?)}"
+
+# Fixed binding types for the stored procedure parameters (two YYYYMM ints, seven filters)
+# so every call is sent with the same typed signature and the server plan can be reused
+_SP_INPUT_SIZES = [(pyodbc.SQL_INTEGER, 0, 0)] * 2 + [(pyodbc.SQL_WVARCHAR, 4000, 0)] * 7
+
+# Stored procedure parameter names, in call order (used for logging only)
+_SP_PARAM_NAMES = ("fromMonth", "ToMonth", "hs", "prod", "Iec", "ImpCmp", "forcount", "forname", "port")
+
+def _params_fingerprint(params):
+    """Hash the essential filter parameters into a 64-bit integer cache key"""
+    key = (
+        params.fromMonth, params.toMonth, params.hs, params.prod, params.iec,
+        params.impCmp, params.forcount, params.forname, params.port
+    )
+    return int.from_bytes(hashlib.blake2b(repr(key).encode(), digest_size=8).digest(), "big")
+
+def _select_list(columns=None):
+    """Build the SELECT column list, projecting to the requested (or default) columns"""
+    columns = columns if columns is not None else DEFAULT_IMPORT_COLUMNS
+    if not columns:
+        return "*"
+    return ", ".join(quote_ident(column) for column in columns)
+
+def get_import_view_columns(conn, view_name):
+    """Get an import view's full column list (cached per view) and check IMPORT_COLUMNS against it
     
-    for key in key_params:
-        if getattr(cached_params, key, None) != getattr(new_params, key, None):
-            return False
+    The first column of the full view is its HS code; positional column roles are named from this list.
+    """
+    with _cache_lock:
+        view_columns = _view_columns.get(view_name)
+    if view_columns is not None:
+        return view_columns
+    
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT TOP 0 * FROM {view_name}")
+        view_columns = [column[0] for column in cursor.description]
+    finally:
+        cursor.close()
+    
+    # A projection naming a missing column would fail (or shift columns) on every request
+    missing = [column for column in DEFAULT_IMPORT_COLUMNS if column not in view_columns]
+    if missing:
+        raise Exception(f"IMPORT_COLUMNS lists columns that are not in view {view_name}: {', '.join(missing)}")
     
-    return True
+    with _cache_lock:
+        _view_columns[view_name] = view_columns
+    return view_columns
+
+def _selected_view(params):
+    """Resolve the configured view name for the request's selectedView"""
+    selected_view_key = params.selectedView or "IMPORT_VIEW_1"
+    return settings.IMPORT_VIEWS.get(selected_view_key, {}).get("value", settings.IMPORT_VIEW)
+
+def _result_cache_key(params, columns=None):
+    """Persistent result cache key: parameter fingerprint plus the view and column selection"""
+    columns = columns if columns is not None else DEFAULT_IMPORT_COLUMNS
+    scope = repr((_selected_view(params), tuple(columns or ())))
+    scope_hash = hashlib.blake2b(scope.encode(), digest_size=4).hexdigest()
+    return f"import_{_params_fingerprint(params):016x}_{scope_hash}"
+
+def _cached_result_path(operation_id):
+    """Get the persisted result file this operation was resolved to, if any"""
+    from ..core.operation_tracker import get_operation_details
+    operation_details = get_operation_details(operation_id)
+    return operation_details.get("result_cache_path") if operation_details else None
 
 def _check_temp_table_exists(conn, view_name=None):
     """Check if the temporary table exists and has data"""
@@ -44,6 +124,85 @@ def _check_temp_table_exists(conn, view_name=None):
     except Exception:
         return False
 
+def _arrow_schema(description):
+    """Map a pyodbc cursor.description to a fixed Arrow schema, or None if a type is unsupported"""
+    fields = []
+    for name, type_code, _display_size, _internal_size, precision, scale, _null_ok in description:
+        if type_code is str:
+            arrow_type = pa.string()
+        elif type_code is int:
+            arrow_type = pa.int64()
+        elif type_code is float:
+            arrow_type = pa.float64()
+        elif type_code is Decimal:
+            arrow_type = pa.decimal128(precision, scale)
+        elif type_code is datetime:
+            arrow_type = pa.timestamp("us")
+        elif type_code is date:
+            arrow_type = pa.date32()
+        elif type_code is time:
+            arrow_type = pa.time64("us")
+        elif type_code is bool:
+            arrow_type = pa.bool_()
+        elif type_code in (bytes, bytearray):
+            arrow_type = pa.binary()
+        else:
+            return None
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+def _rows_to_record_batch(rows, columns, schema=None):
+    """Build an Arrow RecordBatch column-by-column from pyodbc row tuples"""
+    if schema is not None:
+        arrays = [pa.array(column_values, type=field.type) for column_values, field in zip(zip(*rows), schema)]
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+    arrays = [pa.array(column_values, from_pandas=True) for column_values in zip(*rows)]
+    return pa.RecordBatch.from_arrays(arrays, names=columns)
+
+def _numpy_dtypes(description):
+    """Map a pyodbc cursor.description to one numpy dtype per column (object where no fixed type fits)"""
+    dtypes = []
+    for _name, type_code, *_rest in description:
+        if type_code is int:
+            dtypes.append(np.dtype(np.int64))
+        elif type_code is float:
+            dtypes.append(np.dtype(np.float64))
+        elif type_code is datetime:
+            dtypes.append(np.dtype("datetime64[ns]"))
+        else:
+            # Strings, decimals, dates and bits (where NULL must not become False) stay objects
+            dtypes.append(np.dtype(object))
+    return dtypes
+
+def _rows_to_typed_dataframe(rows, columns, dtypes):
+    """Build a DataFrame column-by-column with pre-declared dtypes instead of per-value inference"""
+    data = {}
+    for column, column_values, dtype in zip(columns, zip(*rows), dtypes):
+        try:
+            data[column] = np.asarray(column_values, dtype=dtype)
+        except (TypeError, ValueError):
+            # NULLs in an integer column - keep the values as objects
+            data[column] = np.asarray(column_values, dtype=object)
+    if not data:
+        return pd.DataFrame(columns=columns)
+    return pd.DataFrame(data, columns=columns, copy=False)
+
+def to_pandas_batch(batch):
+    """Convert an Arrow RecordBatch to a DataFrame, freeing Arrow buffers as pandas takes them over"""
+    return batch.to_pandas(split_blocks=True, self_destruct=True)
+
+def _rows_to_dataframe(rows, columns, dtypes=None):
+    """Convert a fetched batch of rows to a DataFrame, going through Arrow when available"""
+    if pa is not None:
+        try:
+            return to_pandas_batch(_rows_to_record_batch(rows, columns))
+        except (pa.ArrowException, TypeError):
+            # Column values Arrow cannot type (e.g. mixed objects) - fall back to pandas
+            pass
+    if dtypes is not None:
+        return _rows_to_typed_dataframe(rows, columns, dtypes)
+    return pd.DataFrame.from_records(rows, columns=columns)
+
 @log_execution_time
 def execute_import_procedure(conn, params, operation_id):
     """Execute the import stored procedure with the given parameters"""
@@ -63,51 +222,77 @@ def execute_import_procedure(conn, params, operation_id):
         f"[{operation_id}] Using view: {selected_view}",
         extra={"operation_id": operation_id, "selected_view": selected_view}
     )
-      # Build the query parameters for the stored procedure
-    sp_params = {
-        "fromMonth": params.fromMonth,
-        "ToMonth": params.toMonth,
-        "hs": params.hs or "",
-        "prod": params.prod or "",
-        "Iec": params.iec or "",
-        "ImpCmp": params.impCmp or "",  # Changed from ExpCmp to ImpCmp
-        "forcount": params.forcount or "",
-        "forname": params.forname or "",
-        "port": params.port or ""
-    }
     
-    # Determine which view to use
-    selected_view_key = params.selectedView or "IMPORT_VIEW_1"
-    selected_view = settings.IMPORT_VIEWS.get(selected_view_key, {}).get("value", settings.IMPORT_VIEW)
-    
-    # Check if we need to re-execute the stored procedure
-    cache_valid = _params_match(_query_cache["params"], params) and _check_temp_table_exists(conn, selected_view)
+    # Check if we need to re-execute the stored procedure; the temp table probe is
+    # skipped while the view was verified within the TTL
+    fingerprint = _params_fingerprint(params)
+    with _cache_lock:
+        cache_entry = _query_cache.get(fingerprint)
+        cache_valid = cache_entry is not None and cache_entry["staged"]
+        if cache_valid:
+            _query_cache.move_to_end(fingerprint)
+        verified_at = _temp_table_verified_at.get(selected_view)
+    
+    if cache_valid and (verified_at is None or (datetime.now() - verified_at).total_seconds() >= _TEMP_TABLE_TTL_SECONDS):
+        cache_valid = _check_temp_table_exists(conn, selected_view)
+        if cache_valid:
+            with _cache_lock:
+                _temp_table_verified_at[selected_view] = datetime.now()
+    
+    # A result persisted by an earlier process replaces the stored procedure run entirely;
+    # the rest of this operation then reads from that file instead of the view
+    cached_path = None if cache_valid else result_cache.get_cached_result(_result_cache_key(params))
+    if cached_path:
+        from ..core.operation_tracker import set_operation_detail
+        set_operation_detail(operation_id, "result_cache_path", cached_path)
+        record_count = result_cache.cached_row_count(cached_path)
+        import_logger.info(
+            f"[{operation_id}] Using persisted results from {cached_path}",
+            extra={
+                "operation_id": operation_id,
+                "cached": True,
+                "record_count": record_count
+            }
+        )
+        return record_count, True
     
     if not cache_valid:
+        # Positional stored procedure arguments, in _SP_PARAM_NAMES order
+        sp_args = (
+            params.fromMonth,
+            params.toMonth,
+            params.hs or "",
+            params.prod or "",
+            params.iec or "",
+            params.impCmp or "",
+            params.forcount or "",
+            params.forname or "",
+            params.port or ""
+        )
+        
         import_logger.info(
             f"[{operation_id}] Cache miss or invalid, executing stored procedure",
             extra={
                 "operation_id": operation_id,
                 "cached": False,
-                "sp_params": mask_sensitive_data(sp_params)
+                "sp_params": mask_sensitive_data(dict(zip(_SP_PARAM_NAMES, sp_args)))
             }
         )
         
-        sp_start_time = datetime.now()
+        sp_start_ns = perf_counter_ns()
         
         # Execute the stored procedure to populate the temp table
-        param_list = list(sp_params.values())
-        sp_call = f"EXEC {settings.IMPORT_STORED_PROCEDURE} ?, ?, ?, ?, ?, ?, ?, ?, ?"
-        
-        import_logger.debug(f"[{operation_id}] Executing stored procedure: {sp_call}", extra={"operation_id": operation_id})
+        import_logger.debug(f"[{operation_id}] Executing stored procedure: {_SP_CALL}", extra={"operation_id": operation_id})
         
         # Use cursor directly for executing stored procedure
         cursor = conn.cursor()
-        cursor.execute(sp_call, param_list)
+        cursor.setinputsizes(_SP_INPUT_SIZES)
+        cursor.execute(_SP_CALL, *sp_args)
+        cursor.setinputsizes(None)
         conn.commit()
         cursor.close()
         
-        sp_execution_time = (datetime.now() - sp_start_time).total_seconds()
+        sp_execution_time = (perf_counter_ns() - sp_start_ns) / 1e9
         import_logger.info(
             f"[{operation_id}] Stored procedure executed in {sp_execution_time:.2f} seconds",
             extra={
@@ -115,13 +300,23 @@ def execute_import_procedure(conn, params, operation_id):
                 "execution_time": sp_execution_time
             }
         )
-          # Update cache
-        _query_cache["params"] = params
-        _query_cache["timestamp"] = datetime.now()
         
         # Get record count
         record_count = get_total_row_count_import(conn, params, operation_id)
-        _query_cache["record_count"] = record_count
+        
+        # Update cache; the staging table now holds this fingerprint's rows only
+        with _cache_lock:
+            for entry in _query_cache.values():
+                entry["staged"] = False
+            _query_cache[fingerprint] = {
+                "timestamp": datetime.now(),
+                "record_count": record_count,
+                "staged": True
+            }
+            _query_cache.move_to_end(fingerprint)
+            if len(_query_cache) > _CACHE_MAX:
+                _query_cache.popitem(last=False)
+            _temp_table_verified_at[selected_view] = datetime.now()
         
         return record_count, False
     else:
@@ -131,14 +326,14 @@ def execute_import_procedure(conn, params, operation_id):
             extra={
                 "operation_id": operation_id,
                 "cached": True,
-                "cache_age": (datetime.now() - _query_cache["timestamp"]).total_seconds()
+                "cache_age": (datetime.now() - cache_entry["timestamp"]).total_seconds()
             }
         )
         
-        return _query_cache["record_count"], True
+        return cache_entry["record_count"], True
 
 @log_execution_time
-def get_preview_data_import(conn, params, operation_id, sample_size=None):
+def get_preview_data_import(conn, params, operation_id, sample_size=None, columns=None):
     """Get a limited number of rows for preview
     
     Args:
@@ -146,6 +341,7 @@ def get_preview_data_import(conn, params, operation_id, sample_size=None):
         params: Import parameters including selectedView
         operation_id: Operation ID for tracking
         sample_size: Number of rows to fetch (uses configurable default if None)
+        columns: Columns to select (uses DEFAULT_IMPORT_COLUMNS if None)
     
     Returns:
         DataFrame with preview data
@@ -169,8 +365,23 @@ def get_preview_data_import(conn, params, operation_id, sample_size=None):
     # Update progress
     update_operation_progress(operation_id, 0, 100)
     
-    # Get preview data with configurable row limit
-    query = f"SELECT TOP {sample_size} * FROM {selected_view} ORDER BY [DATE]"
+    # Serve the preview from a persisted result when the procedure was skipped
+    cached_path = _cached_result_path(operation_id)
+    if cached_path:
+        table = result_cache.read_top_rows(cached_path, sample_size)
+        if columns:
+            table = table.select(columns)
+        df = table.to_pandas()
+        import_logger.info(
+            f"[{operation_id}] Preview served from persisted results, returned {len(df)} rows",
+            extra={"operation_id": operation_id, "row_count": len(df)}
+        )
+        update_operation_progress(operation_id, 100, 100)
+        return df
+    
+    # Get preview data with configurable row limit. No ORDER BY, like the full fetch: the preview
+    # shows the workbook's first rows, and the filename's HS code comes from the same row
+    query = f"SELECT TOP {sample_size} {_select_list(columns)} FROM {selected_view}"
     
     import_logger.debug(
         f"[{operation_id}] Executing preview query on view {selected_view}: {query}", 
@@ -178,9 +389,9 @@ def get_preview_data_import(conn, params, operation_id, sample_size=None):
     )
     
     # Execute query and convert to DataFrame
-    start_time = datetime.now()
+    start_ns = perf_counter_ns()
     df = query_to_dataframe(conn, query)
-    execution_time = (datetime.now() - start_time).total_seconds()
+    execution_time = (perf_counter_ns() - start_ns) / 1e9
     
     # Log query execution
     import_logger.info(
@@ -219,13 +430,13 @@ def get_total_row_count_import(conn, params, operation_id):
     return count
 
 @log_execution_time
-def get_column_headers_import(conn, params, operation_id):
+def get_column_headers_import(conn, params, operation_id, columns=None):
     """Get the column headers from the result set"""
     # Determine which view to use
     selected_view_key = params.selectedView or "IMPORT_VIEW_1"
     selected_view = settings.IMPORT_VIEWS.get(selected_view_key, {}).get("value", settings.IMPORT_VIEW)
     
-    query = f"SELECT TOP 0 * FROM {selected_view}"
+    query = f"SELECT TOP 0 {_select_list(columns)} FROM {selected_view}"
     
     import_logger.debug(f"[{operation_id}] Executing headers query: {query}", extra={"operation_id": operation_id, "selected_view": selected_view})
     
@@ -265,10 +476,61 @@ def get_first_row_hs_code_import(conn, params, operation_id):
     return [hs_code] if hs_code else [None]
 
 @log_execution_time
-def fetch_data_in_chunks_import(conn, params, operation_id, batch_size=None):
-    """Fetch data in chunks to avoid memory issues - using cursor-based approach like the export system"""
+def get_import_metadata(conn, params, operation_id, columns=None):
+    """Get the row count, column headers and first-row HS code in one round-trip
+    
+    Returns:
+        Tuple of (count, headers, first_row_hs) with first_row_hs shaped like
+        get_first_row_hs_code_import's result
+    """
+    # Determine which view to use
+    selected_view_key = params.selectedView or "IMPORT_VIEW_1"
+    selected_view = settings.IMPORT_VIEWS.get(selected_view_key, {}).get("value", settings.IMPORT_VIEW)
+    
+    # The HS code is looked up by name, since IMPORT_COLUMNS may reorder or drop columns
+    hs_column = get_import_view_columns(conn, selected_view)[0]
+    
+    # Persisted results carry the count in the footer and the headers in the schema
+    cached_path = _cached_result_path(operation_id)
+    if cached_path:
+        count = result_cache.cached_row_count(cached_path)
+        headers = result_cache.cached_columns(cached_path)
+        first_batch = next(result_cache.iter_cached_batches(cached_path, 1, 1), None)
+        has_hs = first_batch is not None and first_batch.num_rows and hs_column in headers
+        hs_code = first_batch.column(hs_column)[0].as_py() if has_hs else None
+        return count, headers, [hs_code] if hs_code else [None]
+    
+    # Two result sets in one batch: the first row (plus its description) and the count
+    query = f"SELECT TOP 1 {_select_list(columns)} FROM {selected_view}; SELECT COUNT(*) FROM {selected_view}"
+    
+    import_logger.debug(f"[{operation_id}] Executing metadata query: {query}", extra={"operation_id": operation_id, "selected_view": selected_view})
+    
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query)
+        headers = [column[0] for column in cursor.description]
+        row = cursor.fetchone()
+        cursor.nextset()
+        count = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+    
+    hs_code = row[headers.index(hs_column)] if row and hs_column in headers else None
+    import_logger.info(f"[{operation_id}] Total row count: {count}", extra={"operation_id": operation_id, "row_count": count})
+    import_logger.debug(f"[{operation_id}] Column headers: {headers}, first row HS code: {hs_code}", extra={"operation_id": operation_id})
+    
+    return count, headers, [hs_code] if hs_code else [None]
+
+@log_execution_time
+def fetch_data_in_chunks_import(conn, params, operation_id, batch_size=None, columns=None):
+    """Fetch data in chunks to avoid memory issues - using cursor-based approach like the export system
+    
+    Yields pandas DataFrames. Only the given columns are selected (DEFAULT_IMPORT_COLUMNS if None, all if empty).
+    Results persisted by the result cache are streamed from disk, and complete fetches
+    from the database are spooled to it for later requests.
+    """
     # Import here to avoid circular imports
-    from ..core.operation_tracker import is_operation_cancelled, get_operation_details, _operations_lock
+    from ..core.operation_tracker import is_operation_cancelled, get_operation_details, cache_total_count
     
     if batch_size is None:
         batch_size = settings.get_batch_size('import')
@@ -276,14 +538,17 @@ def fetch_data_in_chunks_import(conn, params, operation_id, batch_size=None):
     # Get operation details which should already have total_count cached
     operation_details = get_operation_details(operation_id)
     
+    cached_path = operation_details.get("result_cache_path") if operation_details else None
+    
     # Use cached total count if available, otherwise fetch it (fallback)
     total_count = operation_details.get('total_count') if operation_details else None
     if total_count is None:
-        total_count = get_total_row_count_import(conn, params, operation_id)
+        if cached_path:
+            total_count = result_cache.cached_row_count(cached_path)
+        else:
+            total_count = get_total_row_count_import(conn, params, operation_id)
         # Cache it if we had to look it up
-        if operation_details:
-            with _operations_lock:
-                operation_details['total_count'] = total_count
+        cache_total_count(operation_id, total_count)
     
     # Check if we need to limit the number of rows due to Excel row limit
     max_rows = operation_details.get('max_rows', total_count) if operation_details else total_count
@@ -316,13 +581,21 @@ def fetch_data_in_chunks_import(conn, params, operation_id, batch_size=None):
                 "batch_size": batch_size
             }
         )
-      # Execute one query to get all the data and use a cursor-based approach like the export system
-    # Determine which view to use
-    selected_view_key = params.selectedView or "IMPORT_VIEW_1"
-    selected_view = settings.IMPORT_VIEWS.get(selected_view_key, {}).get("value", settings.IMPORT_VIEW)
     
-    # Build the main query once
-    query = f"SELECT * FROM {selected_view} ORDER BY [DATE]"
+    if cached_path:
+        yield from _fetch_cached_batches(cached_path, operation_id, batch_size, rows_to_fetch, num_batches)
+        return
+    
+    # Execute one query to get all the data and use a cursor-based approach like the export system
+    selected_view = _selected_view(params)
+    
+    # Spool the complete result to the persistent cache (a row-limited fetch is incomplete)
+    spool_key = _result_cache_key(params, columns) if result_cache.is_enabled() and rows_to_fetch == total_count else None
+    spool = None
+    
+    # Build the main query once. No ORDER BY: rows stream in staging-table order, which
+    # avoids a full sort of the temp table on every export (order it in the procedure if needed)
+    query = f"SELECT {_select_list(columns)} FROM {selected_view}"
     
     import_logger.debug(
         f"[{operation_id}] Executing main query and setting up cursor on view {selected_view}",
@@ -333,66 +606,150 @@ def fetch_data_in_chunks_import(conn, params, operation_id, batch_size=None):
         }
     )
     
-    # Set up cursor with optimized fetch settings
+    # The scan is read-only and the stored procedure has already committed, so run it in
+    # autocommit mode to avoid holding an open transaction for the whole export
+    previous_autocommit = conn.autocommit
+    conn.autocommit = True
+    
+    # Set up cursor with optimized fetch settings; size the fetch buffer to a whole batch
     cursor = conn.cursor()
+    cursor.arraysize = batch_size
     cursor.execute(query)
-      # Set cursor options for better performance - now configurable
-    cursor.arraysize = settings.DB_CURSOR_ARRAY_SIZE  # Configurable batch size for better performance
+    
+    prefetch_stop = None
+    prefetch_thread = None
     
     try:
         # Process data in batches using cursor-based approach
         rows_processed = 0
         batch_num = 0
         
-        while rows_processed < rows_to_fetch:
+        column_names = [column[0] for column in cursor.description]
+        schema = _arrow_schema(cursor.description) if pa is not None else None
+        dtypes = _numpy_dtypes(cursor.description)
+        if spool_key and schema is not None:
+            try:
+                spool = result_cache.ResultSpool(spool_key, schema)
+            except Exception as e:
+                import_logger.warning(f"[{operation_id}] Result cache spooling unavailable: {str(e)}", extra={"operation_id": operation_id})
+        
+        # Per-batch logs are DEBUG only; skip building them entirely when DEBUG is off
+        debug_enabled = import_logger.isEnabledFor(logging.DEBUG)
+        
+        # Read ahead on a background thread while this one converts and yields batches
+        rows_queue, prefetch_stop, prefetch_thread = start_row_prefetch(cursor, operation_id, batch_size, rows_to_fetch)
+        
+        while True:
             # Check if operation has been cancelled
             if is_operation_cancelled(operation_id):
                 import_logger.info(f"[{operation_id}] Data fetch cancelled during batch {batch_num + 1}/{num_batches}")
                 raise Exception("Operation cancelled by user")
             
-            # Calculate how many rows we should fetch in this batch
-            current_batch_size = min(batch_size, rows_to_fetch - rows_processed)
-            if current_batch_size <= 0:
-                break
-            
             batch_num += 1
             
-            import_logger.debug(
-                f"[{operation_id}] Fetching batch {batch_num}/{num_batches}",
-                extra={
-                    "operation_id": operation_id,
-                    "batch_num": batch_num,
-                    "rows_processed": rows_processed
-                }
-            )
+            if debug_enabled:
+                import_logger.debug(
+                    f"[{operation_id}] Fetching batch {batch_num}/{num_batches}",
+                    extra={
+                        "operation_id": operation_id,
+                        "batch_num": batch_num,
+                        "rows_processed": rows_processed
+                    }
+                )
             
-            # Fetch the batch from cursor
-            start_time = datetime.now()
-            rows = cursor.fetchmany(current_batch_size)
+            # Take the next prefetched batch
+            start_ns = perf_counter_ns()
+            rows = rows_queue.get()
             
-            # If no rows returned, we're done
-            if not rows:
+            # None marks the end of the data (or a cancellation seen by the fetch thread)
+            if rows is None:
+                if is_operation_cancelled(operation_id):
+                    import_logger.info(f"[{operation_id}] Data fetch cancelled during batch {batch_num}/{num_batches}")
+                    raise Exception("Operation cancelled by user")
                 break
-                
-            # Convert to DataFrame
-            columns = [column[0] for column in cursor.description]
-            df = pd.DataFrame.from_records(rows, columns=columns)
+            if isinstance(rows, Exception):
+                raise rows
+            
+            # Spool the batch to the persistent cache; a failure only stops the spooling
+            batch = None
+            if spool is not None:
+                try:
+                    batch = _rows_to_record_batch(rows, column_names, schema)
+                    spool.write(batch)
+                except Exception as e:
+                    import_logger.warning(f"[{operation_id}] Result cache spooling stopped: {str(e)}", extra={"operation_id": operation_id})
+                    spool.abort()
+                    spool = None
+                    batch = None
             
-            execution_time = (datetime.now() - start_time).total_seconds()
+            # Convert to a DataFrame, reusing the spooled Arrow batch when there is one
+            if batch is not None:
+                df = to_pandas_batch(batch)
+            else:
+                df = _rows_to_dataframe(rows, column_names, dtypes)
+            
+            execution_time = (perf_counter_ns() - start_ns) / 1e9
             rows_processed += len(df)
             
             # Log batch fetch
-            import_logger.info(
-                f"[{operation_id}] Batch {batch_num}/{num_batches} fetched in {execution_time:.2f} seconds, returned {len(df)} rows",
-                extra={
-                    "operation_id": operation_id,
-                    "batch_num": batch_num,
-                    "execution_time": execution_time,
-                    "row_count": len(df)
-                }
-            )
+            if debug_enabled:
+                import_logger.debug(
+                    f"[{operation_id}] Batch {batch_num}/{num_batches} fetched in {execution_time:.2f} seconds, returned {len(df)} rows",
+                    extra={
+                        "operation_id": operation_id,
+                        "batch_num": batch_num,
+                        "execution_time": execution_time,
+                        "row_count": len(df)
+                    }
+                )
             
             yield df
+        
+        import_logger.info(
+            f"[{operation_id}] Fetched {rows_processed} rows in {batch_num - 1} batches",
+            extra={
+                "operation_id": operation_id,
+                "rows_processed": rows_processed,
+                "num_batches": batch_num - 1
+            }
+        )
+        
+        # Publish the spooled result only if every row made it into the file
+        if spool is not None:
+            if rows_processed == total_count:
+                spool.commit()
+            else:
+                spool.abort()
+            spool = None
     finally:
-        # Always close the cursor
-        cursor.close()
\ No newline at end of file
+        # Stop the fetch thread before the cursor it reads from is closed
+        if prefetch_thread is not None:
+            prefetch_stop.set()
+            prefetch_thread.join()
+        
+        # Discard an unfinished spool (error, cancellation or consumer stopped early)
+        if spool is not None:
+            spool.abort()
+        
+        # Always close the cursor and restore the connection's transaction mode
+        cursor.close()
+        conn.autocommit = previous_autocommit
+
+def _fetch_cached_batches(path, operation_id, batch_size, rows_to_fetch, num_batches):
+    """Stream a persisted result in batches, mirroring the database fetch loop"""
+    # Import here to avoid circular imports
+    from ..core.operation_tracker import is_operation_cancelled
+    
+    import_logger.debug(f"[{operation_id}] Streaming persisted results from {path}", extra={"operation_id": operation_id})
+    
+    for batch_num, batch in enumerate(result_cache.iter_cached_batches(path, batch_size, rows_to_fetch), 1):
+        if is_operation_cancelled(operation_id):
+            import_logger.info(f"[{operation_id}] Data fetch cancelled during batch {batch_num}/{num_batches}")
+            raise Exception("Operation cancelled by user")
+        
+        import_logger.debug(
+            f"[{operation_id}] Batch {batch_num}/{num_batches} read from persisted results, returned {batch.num_rows} rows",
+            extra={"operation_id": operation_id, "batch_num": batch_num, "row_count": batch.num_rows}
+        )
+        
+        yield to_pandas_batch(batch)
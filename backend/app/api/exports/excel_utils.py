@@ -2,7 +2,6 @@ import os
 import pandas as pd
 import numpy as np
 import json
-from datetime import datetime
 import tempfile
 import uuid
 import pathlib
@@ -10,23 +9,60 @@ import gc
 from typing import List, Dict, Any, Optional
 import xlsxwriter
 
+try:
+    import psutil
+except ImportError:  # psutil is optional; workbooks then always use constant_memory mode
+    psutil = None
+
 from ..core.config import settings
-from ..core.logger import export_logger, log_execution_time
+from ..core.logger import log_execution_time
 from ..core.logging_utils import log_excel_completion
 
+# Month abbreviations used in filenames, indexed by month number - 1
+MONTH_ABBR = ("JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC")
+
+def month_abbr(month, default=""):
+    """Get the abbreviation for a two-digit month ("01"-"12"), or default if it is not one"""
+    if len(month) == 2 and month.isdigit() and 1 <= int(month) <= 12:
+        return MONTH_ABBR[int(month) - 1]
+    return default
+
+def first_hs_code(value):
+    """Take the first HS code of a comma-separated filter, without spaces"""
+    return value.strip().replace(" ", "").split(",")[0]
+
+def underscore_spaces(value):
+    """Replace spaces with underscores for use in a filename"""
+    return value.replace(" ", "_")
+
+# Filter parameters that make up the filename, in order, with their transforms
+_FILENAME_FIELDS = (
+    ("hs", first_hs_code),
+    ("prod", underscore_spaces),
+    ("iec", str),
+    ("expCmp", underscore_spaces),
+    ("forcount", underscore_spaces),
+    ("forname", underscore_spaces),
+    ("port", underscore_spaces)
+)
+
+def join_filename_filters(params, fields):
+    """Join the (attr, transform) filter fields of params with "_", skipping empty and wildcard ("%") filters"""
+    parts = []
+    for attr, transform in fields:
+        value = getattr(params, attr)
+        if value and value != "%":
+            part = transform(value)
+            if part:
+                parts.append(part)
+    return "_".join(parts)
+
 def create_filename(params, first_row_hs):
     """Create a filename for the Excel export based on the parameters"""
     # Extract month and year for filename
     from_month_str = str(params.fromMonth)
     to_month_str = str(params.toMonth)
     
-    # Convert month number to month name
-    month_names = {
-        "01": "JAN", "02": "FEB", "03": "MAR", "04": "APR", 
-        "05": "MAY", "06": "JUN", "07": "JUL", "08": "AUG", 
-        "09": "SEP", "10": "OCT", "11": "NOV", "12": "DEC"
-    }
-    
     # Get month and year parts
     from_month = from_month_str[-2:]
     from_year = from_month_str[2:4]  # Get the last 2 digits of year (YYYY format)
@@ -34,8 +70,8 @@ def create_filename(params, first_row_hs):
     to_year = to_month_str[2:4]  # Get the last 2 digits of year (YYYY format)
     
     # Create month-year strings
-    mon1 = month_names.get(from_month, "") + from_year
-    mon2 = month_names.get(to_month, "") + to_year
+    mon1 = month_abbr(from_month) + from_year
+    mon2 = month_abbr(to_month) + to_year
     
     # Determine if we need to show a range or single month
     if mon1 == mon2:
@@ -44,40 +80,7 @@ def create_filename(params, first_row_hs):
         month_year = mon1 + "-" + mon2
     
     # Build filename with all search parameters
-    filename1 = ""
-    
-    # Add HS code if provided
-    if params.hs and params.hs != "%":
-        hs_code = params.hs.strip().replace(" ", "").split(",")[0]
-        filename1 = filename1 + hs_code
-    
-    # Add product if provided
-    if params.prod and params.prod != "%":
-        filename1 = filename1 + "_" + params.prod.replace(" ", "_")
-    
-    # Add IEC if provided
-    if params.iec and params.iec != "%":
-        filename1 = filename1 + "_" + params.iec
-    
-    # Add exporter company if provided
-    if params.expCmp and params.expCmp != "%":
-        filename1 = filename1 + "_" + params.expCmp.replace(" ", "_")
-    
-    # Add foreign country if provided
-    if params.forcount and params.forcount != "%":
-        filename1 = filename1 + "_" + params.forcount.replace(" ", "_")
-    
-    # Add foreign importer name if provided
-    if params.forname and params.forname != "%":
-        filename1 = filename1 + "_" + params.forname.replace(" ", "_")
-    
-    # Add port if provided
-    if params.port and params.port != "%":
-        filename1 = filename1 + "_" + params.port.replace(" ", "_")
-    
-    # Remove leading underscore if present
-    if filename1 and filename1[0] == "_":
-        filename1 = filename1[1:]
+    filename1 = join_filename_filters(params, _FILENAME_FIELDS)
     
     # If no parameters were provided, use default name
     if not filename1:
@@ -92,15 +95,31 @@ def create_filename(params, first_row_hs):
     filename = f"{filename1}_{month_year}EXP.xlsx"
     return filename
 
-def setup_excel_workbook(file_path):
-    """Set up an Excel workbook with optimized settings for large datasets"""
+# Rough in-memory cost of one written cell, used to decide whether a workbook fits in RAM
+_EST_BYTES_PER_CELL = 80
+
+def _fits_in_memory(row_count, column_count):
+    """Check whether a workbook of this size can be built in memory with a 4x RAM margin"""
+    if settings.EXCEL_MEMORY_MODE != "auto" or psutil is None or not row_count or not column_count:
+        return False
+    estimated_bytes = row_count * column_count * _EST_BYTES_PER_CELL
+    return psutil.virtual_memory().available > 4 * estimated_bytes
+
+def setup_excel_workbook(file_path, row_count=None, column_count=None):
+    """Set up an Excel workbook with optimized settings for large datasets
+    
+    With row_count and column_count given, a workbook that fits comfortably in available memory
+    is built in memory (faster); otherwise rows are streamed to disk in constant_memory mode.
+    """
+    in_memory = _fits_in_memory(row_count, column_count)
+    
     # Create a workbook with highly optimized settings for large datasets
     workbook_options = {
-        'constant_memory': True,  # Use constant memory mode for reduced memory usage
+        'constant_memory': not in_memory,  # Stream rows to disk unless the workbook fits in RAM
         'use_zip64': True,       # Enable ZIP64 extensions for files > 4GB
         'default_date_format': 'dd-mmm-yy',  # Set default date format
-        'tmpdir': settings.TEMP_DIR,  # Use temp directory for temporary files
-        'in_memory': False,      # Don't store everything in memory
+        'tmpdir': settings.EXCEL_TMP_DIR,  # Scratch files for streamed rows (defaults to TEMP_DIR)
+        'in_memory': in_memory,  # Assemble the file in memory when it fits
         'strings_to_numbers': False, # Preserve strings like leading zeros
         'strings_to_formulas': False,  # Don't convert strings to formulas (faster)
         'strings_to_urls': False,  # Don't convert strings to URLs (faster)
@@ -155,55 +174,21 @@ def write_excel_headers(worksheet, columns, header_format):
     # Set row height for header
     worksheet.set_row(0, 20)  # Set header row height to 20
 
-def write_data_to_excel(worksheet, cursor, data_format, date_format, operation_id, total_count):
-    """Write data to Excel worksheet in batches (NOTE: This function might be unused)"""
-    # Import here to avoid circular imports
-    from ..core.operation_tracker import is_operation_cancelled
-      # Process data in chunks with optimized approach for large datasets
-    batch_size = settings.get_batch_size('export')  # Use export-specific batch size
-    row_idx = 1  # Start from row 1 (after header)
-    total_rows = 0
-    
-    # Check cancellation frequency - check every N rows for better performance
-    cancellation_check_frequency = 1000
-    rows_since_last_check = 0
-    
-    while True:
-        # Check if operation has been cancelled before fetching and processing each batch
-        if is_operation_cancelled(operation_id):
-            export_logger.info(f"[{operation_id}] Operation cancelled during Excel data writing at row {total_rows}/{total_count}")
-            raise Exception("Operation cancelled by user")
-            
-        chunk_start = datetime.now()
-        rows = cursor.fetchmany(batch_size)
-        if not rows:
-            break
-        
-        # Write data to Excel
-        for row in rows:
-            # Check for cancellation periodically during row processing
-            # This makes cancellation more responsive without checking on every single row
-            rows_since_last_check += 1
-            if rows_since_last_check >= cancellation_check_frequency:
-                if is_operation_cancelled(operation_id):
-                    export_logger.info(f"[{operation_id}] Operation cancelled during Excel data writing at row {total_rows}/{total_count}")
-                    raise Exception("Operation cancelled by user")
-                rows_since_last_check = 0
-                
-            # Only set row height for every 10th row to improve performance
-            if row_idx % 10 == 0:
-                worksheet.set_row(row_idx, 15)
-            
-            for col_idx, value in enumerate(row):
-                # Use date format for column 3 (index 2)
-                if col_idx == 2 and value:  # SB_Date column
-                    worksheet.write(row_idx, col_idx, value, date_format)
-                else:
-                    worksheet.write(row_idx, col_idx, value, data_format)
-            row_idx += 1
-        
-        rows_processed = len(rows)
-        total_rows += rows_processed
-    
-    # Return the total number of rows processed
-    return total_rows
\ No newline at end of file
+def frame_column_writers(worksheet, dtypes, data_format, date_format):
+    """Map each DataFrame column dtype to a typed worksheet writer and its cell format
+
+    Object (and categorical) columns may mix strings and None, so they keep the generic write().
+    Returns parallel (writers, formats) lists; SB_Date (index 2) gets the date format.
+    """
+    writers = []
+    for dtype in dtypes:
+        if dtype.kind in "iuf":
+            writers.append(worksheet.write_number)
+        elif dtype.kind == "M":
+            writers.append(worksheet.write_datetime)
+        elif dtype.kind == "b":
+            writers.append(worksheet.write_boolean)
+        else:
+            writers.append(worksheet.write)
+    formats = [date_format if col_idx == 2 else data_format for col_idx in range(len(writers))]
+    return writers, formats
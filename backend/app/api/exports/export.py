@@ -4,7 +4,6 @@
 import uuid
 import os
 import pathlib
-import gc
 import numpy as np
 from datetime import datetime
 
@@ -36,11 +35,7 @@ def preview_data(params):
 def generate_excel(params):
     """
     Generate an Excel file based on the export parameters.
-    Returns the path to the generated Excel file and the operation ID.
+    Returns an ExportResult with the file path (or row limit details) and the operation ID.
     """
     # Call the refactored implementation from export_service.py
-    # This will return both the file path and the operation ID
-    file_path, operation_id = generate_excel_service(params)
-    
-    # Return the file path (for streaming) and add the operation ID to the response headers
-    return file_path, operation_id
\ No newline at end of file
+    return generate_excel_service(params)
\ No newline at end of file
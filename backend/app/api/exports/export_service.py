@@ -1,4 +1,5 @@
 import os
+import gzip
 import pandas as pd
 import numpy as np
 import json
@@ -6,9 +7,20 @@ from datetime import datetime
 import tempfile
 import uuid
 import pathlib
-import gc
+import time
+import itertools
+import traceback
+from contextlib import ExitStack, closing
+from dataclasses import dataclass
 from typing import List, Dict, Any, Optional
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; only Parquet exports need it
+    pa = None
+    pq = None
+
 from ..core.config import settings
 from ..core.database import get_db_connection
 from ..core.logger import export_logger, log_execution_time
@@ -17,9 +29,6 @@ from ..core.logger import export_logger, log_execution_time
 from ..database_operations.export_database import (
     execute_export_procedure,
     get_preview_data,
-    get_first_row_hs_code,
-    get_column_headers,
-    get_total_row_count,
     fetch_data_in_chunks_export  # Use the new optimized function
 )
 from ..core.logging_utils import (
@@ -33,26 +42,119 @@ from ..core.logging_utils import (
 )
 from ..core.data_processing import (
     CustomJSONEncoder,
-    process_dataframe_for_json
+    process_dataframe_for_json,
+    column_text_widths
 )
 from .excel_utils import (
     create_filename,
     setup_excel_workbook,
     create_excel_formats,
+    frame_column_writers,
     write_excel_headers
 )
 from ..core.operation_tracker import (
     register_operation,
     update_operation_progress,
     mark_operation_completed,
-    is_operation_cancelled
+    is_operation_cancelled,
+    cache_total_count,
+    get_operation_details,
+    _operations_lock
 )
 
+# Number of leading data rows measured to auto-fit column widths
+_WIDTH_SAMPLE_ROWS = 1000
+
+# Export files are written here; settings creates the directory at startup
+_TEMP_DIR = pathlib.Path(settings.TEMP_DIR).resolve()
+
+@dataclass(frozen=True)
+class ExportResult:
+    """Outcome of generate_excel: the written file, or the row limit details when the export paused"""
+    operation_id: str
+    path: Optional[str] = None
+    limit_info: Optional[Dict[str, Any]] = None
+    
+    @property
+    def limit_exceeded(self) -> bool:
+        return self.limit_info is not None
+
 # Constants - now configurable through settings
 def get_excel_row_limit():
     """Get Excel row limit from configuration"""
     return settings.EXCEL_ROW_LIMIT
 
+def _first_row_hs_code(df):
+    """Get the first row's HS code from a fetched chunk as a one-element row, or None if absent"""
+    for name in df.columns:
+        if name.lower() == "hs_code":
+            value = df[name].iat[0]
+            return (None if pd.isna(value) else value,)
+    return None
+
+def _blank_text_nulls(df):
+    """Replace NaN nulls in text columns with None, which xlsxwriter writes as a blank cell
+
+    pandas' str dtype stores missing text as NaN, and write() would turn NaN into a #NUM! error.
+    """
+    text_nulls = {
+        column: df[column].astype(object).where(df[column].notna(), None)
+        for column, dtype in df.dtypes.items()
+        if dtype.kind not in "iufMb" and df[column].hasnans
+    }
+    return df.assign(**text_nulls) if text_nulls else df
+
+def write_parquet_export(chunks, operation_id, file_path, total_count):
+    """Stream fetched DataFrame chunks into a Parquet file; returns the number of rows written"""
+    if pq is None:
+        raise Exception("pyarrow is required for Parquet exports")
+    
+    writer = None
+    total_rows = 0
+    try:
+        for df in chunks:
+            if is_operation_cancelled(operation_id):
+                export_logger.info(f"[{operation_id}] Operation cancelled during Parquet generation at row {total_rows}/{total_count}")
+                raise Exception("Operation cancelled by user")
+            
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if writer is None:
+                # Fix the file schema from the first chunk. Categoricals are stored as plain values
+                # (Parquet dictionary-encodes them itself) and all-NULL columns as strings
+                fields = []
+                for field in table.schema:
+                    if pa.types.is_dictionary(field.type):
+                        field = field.with_type(field.type.value_type)
+                    elif pa.types.is_null(field.type):
+                        field = field.with_type(pa.string())
+                    fields.append(field)
+                writer = pq.ParquetWriter(file_path, pa.schema(fields), compression=settings.PARQUET_COMPRESSION)
+            writer.write_table(table.cast(writer.schema))
+            total_rows += len(df)
+            update_operation_progress(operation_id, total_rows, total_count)
+    finally:
+        if writer is not None:
+            writer.close()
+    
+    return total_rows
+
+def write_csv_export(chunks, operation_id, file_path, total_count, columns):
+    """Stream fetched DataFrame chunks into a gzip-compressed CSV file; returns the number of rows written"""
+    total_rows = 0
+    with gzip.open(file_path, "wt", compresslevel=6, newline="", encoding="utf-8") as csv_file:
+        # Header first, so an empty result still produces a valid file
+        pd.DataFrame(columns=columns).to_csv(csv_file, index=False)
+        for df in chunks:
+            if is_operation_cancelled(operation_id):
+                export_logger.info(f"[{operation_id}] Operation cancelled during CSV generation at row {total_rows}/{total_count}")
+                raise Exception("Operation cancelled by user")
+            
+            df.to_csv(csv_file, index=False, header=False, date_format="%Y-%m-%d %H:%M:%S")
+            total_rows += len(df)
+            update_operation_progress(operation_id, total_rows, total_count)
+    
+    return total_rows
+
 def cleanup_on_error(workbook, file_path):
     """Clean up resources when an error occurs during Excel generation"""
     # Close workbook to release file handles
@@ -132,7 +234,7 @@ def preview_data(params):
 def generate_excel(params):
     """
     Generate an Excel file based on the export parameters.
-    Returns the path to the generated Excel file.
+    Returns an ExportResult with the path to the generated file.
     """
     operation_id = generate_operation_id()
     
@@ -144,13 +246,16 @@ def generate_excel(params):
     workbook = None
     
     try:
+        # Read the configured row limit once; it is consulted per chunk below
+        row_limit = get_excel_row_limit()
+        
         # Log the start of the Excel generation operation
         log_excel_start(operation_id, params)
         
-        # Connect to the database
+        # Connect to the database; the exit stack closes the chunk generator before the connection
         with get_db_connection(
             params.server, params.database, params.username, params.password
-        ) as conn:
+        ) as conn, ExitStack() as exit_stack:
             # Check for cancellation before executing procedure
             if is_operation_cancelled(operation_id):
                 export_logger.info(f"[{operation_id}] Export operation cancelled before execution")
@@ -159,11 +264,22 @@ def generate_excel(params):
             start_time = datetime.now()
             record_count, cache_used = execute_export_procedure(conn, params, operation_id)
             
+            # Parquet and CSV output have no row limit; large exports switch to Parquet when PARQUET_THRESHOLD is set
+            is_parquet = params.export_format == "parquet"
+            is_csv = params.export_format == "csv"
+            if not (is_parquet or is_csv) and pq is not None and 0 < settings.PARQUET_THRESHOLD < record_count:
+                export_logger.info(
+                    f"[{operation_id}] Record count ({record_count}) exceeds Parquet threshold "
+                    f"({settings.PARQUET_THRESHOLD}), writing Parquet instead of xlsx"
+                )
+                is_parquet = True
+            is_excel = not (is_parquet or is_csv)
+            
             # Check if the record count exceeds Excel's row limit
-            if record_count > get_excel_row_limit():
+            if record_count > row_limit and is_excel:
                 export_logger.warning(
-                    f"[{operation_id}] Record count ({record_count}) exceeds Excel row limit ({get_excel_row_limit()}). "
-                    f"Only first {get_excel_row_limit()} rows will be exported."
+                    f"[{operation_id}] Record count ({record_count}) exceeds Excel row limit ({row_limit}). "
+                    f"Only first {row_limit} rows will be exported."
                 )
                   # If user hasn't explicitly confirmed to continue with limited data,
                 # we'll check for a flag in params
@@ -172,30 +288,58 @@ def generate_excel(params):
                     if not getattr(params, 'ignore_excel_limit', False):
                         export_logger.info(f"[{operation_id}] Export operation paused waiting for user confirmation")
                         # Return information about the limit being reached
-                        return {
+                        return ExportResult(operation_id, limit_info={
                             "status": "limit_exceeded",
-                            "message": f"Total records ({record_count}) exceeds Excel row limit ({get_excel_row_limit()})",
+                            "message": f"Total records ({record_count}) exceeds Excel row limit ({row_limit})",
                             "operation_id": operation_id,
                             "total_records": record_count,
-                            "limit": get_excel_row_limit()
-                        }, operation_id
+                            "limit": row_limit
+                        })
             
             # Check for cancellation after procedure execution
             if is_operation_cancelled(operation_id):
                 export_logger.info(f"[{operation_id}] Export operation cancelled after procedure execution")
                 raise Exception("Operation cancelled by user")
             
-            # Get the first row's HS code for the filename
-            first_row_hs = get_first_row_hs_code(conn, operation_id)
+            # The procedure already counted the rows; caching the count lets the fetch skip its COUNT query
+            total_count = record_count
+            cache_total_count(operation_id, total_count)
+            
+            # If total count exceeds Excel limit, we'll only process up to the limit
+            if total_count > row_limit and is_excel:
+                export_logger.warning(
+                    f"[{operation_id}] Limiting export to {row_limit} rows out of {total_count} total records."
+                )
+                total_count = row_limit
+                
+                # Update operation details with the limited row count so database function uses correct limit
+                operation_details = get_operation_details(operation_id)
+                if operation_details:
+                    with _operations_lock:
+                        operation_details['max_rows'] = total_count
+            
+            # Column headers and the filename's HS code come from the first fetched chunk
+            # (an empty result arrives as one empty chunk that still carries the columns)
+            # Closed on any exit (row limit, cancel, error) so its fetch thread stops before the connection does
+            chunks = exit_stack.enter_context(
+                closing(fetch_data_in_chunks_export(conn, operation_id, params=params, excel_limit=is_excel))
+            )
+            first_chunk = next(chunks)
+            columns = list(first_chunk.columns)
+            first_row_hs = _first_row_hs_code(first_chunk) if len(first_chunk) else None
+            
+            # Parquet still needs an empty chunk to write the file schema; the workbook only needs rows
+            if len(first_chunk) or not is_excel:
+                chunks = itertools.chain([first_chunk], chunks)
             
             # Create filename based on parameters
             filename = create_filename(params, first_row_hs)
+            if is_parquet:
+                filename = os.path.splitext(filename)[0] + ".parquet"
+            elif is_csv:
+                filename = os.path.splitext(filename)[0] + ".csv.gz"
             
-            # Ensure temp directory exists
-            temp_dir = pathlib.Path(settings.TEMP_DIR)
-            os.makedirs(temp_dir, exist_ok=True)
-            file_path = str(temp_dir / filename)
-            file_path = os.path.abspath(file_path)
+            file_path = str(_TEMP_DIR / filename)
             
             export_logger.info(f"[{operation_id}] Starting Excel generation at {datetime.now()}, filename: {filename}")
             
@@ -204,16 +348,25 @@ def generate_excel(params):
                 export_logger.info(f"[{operation_id}] Export operation cancelled before workbook creation")
                 raise Exception("Operation cancelled by user")
             
+            if not is_excel:
+                export_logger.info(f"[{operation_id}] Total rows to export: {total_count}")
+                if is_parquet:
+                    total_rows = write_parquet_export(chunks, operation_id, file_path, total_count)
+                else:
+                    total_rows = write_csv_export(chunks, operation_id, file_path, total_count, columns)
+                
+                execution_time = (datetime.now() - start_time).total_seconds()
+                log_excel_completion(operation_id, file_path, total_rows, execution_time)
+                mark_operation_completed(operation_id)
+                return ExportResult(operation_id, path=file_path)
+            
             # Create workbook with optimized settings
-            workbook = setup_excel_workbook(file_path)
+            workbook = setup_excel_workbook(file_path, min(total_count, row_limit), len(columns))
             worksheet = workbook.add_worksheet('Export Data')
             
             # Create Excel formats
             header_format, data_format, date_format = create_excel_formats(workbook)
             
-            # Get column headers
-            columns = get_column_headers(conn, operation_id)
-            
             # Write headers to Excel
             write_excel_headers(worksheet, columns, header_format)
             
@@ -221,81 +374,72 @@ def generate_excel(params):
             max_widths = [len(str(h)) if h else 0 for h in columns]
             min_width = 8 # Ensure a minimum width
             padding = 1 # Padding for autofit
-              # Get total row count for progress tracking
-            total_count = get_total_row_count(conn, operation_id)
             export_logger.info(f"[{operation_id}] Total rows to export: {total_count}")
-              # If total count exceeds Excel limit, we'll only process up to the limit
-            if total_count > get_excel_row_limit():
-                export_logger.warning(
-                    f"[{operation_id}] Limiting export to {get_excel_row_limit()} rows out of {total_count} total records."
-                )
-                total_count = get_excel_row_limit()
-                
-                # Update operation details with the limited row count so database function uses correct limit
-                from ..core.operation_tracker import _operations_lock, get_operation_details
-                operation_details = get_operation_details(operation_id)
-                if operation_details:
-                    with _operations_lock:
-                        operation_details['max_rows'] = total_count
-            
-            # Optimize memory usage by using server-side cursor
-            conn.execute("SET NOCOUNT ON")
             
             # Variables to track total rows processed
             total_rows = 0
               # Use the new optimized fetch_data_in_chunks_export generator
-            for chunk_num, df in enumerate(fetch_data_in_chunks_export(conn, operation_id, params=params), 1):
+            for chunk_num, df in enumerate(chunks, 1):
                 # Check if operation has been cancelled before processing each chunk
                 if is_operation_cancelled(operation_id):
                     export_logger.info(f"[{operation_id}] Operation cancelled during Excel generation at row {total_rows}/{total_count}")
                     cleanup_on_error(workbook, file_path)
                     raise Exception("Operation cancelled by user")
                 
-                chunk_start = datetime.now()
+                chunk_start = time.perf_counter()
                 
                 # Process this chunk of data
                 chunk_size_actual = len(df)
                 row_idx = total_rows + 1  # Start from after the last processed row (1-based for Excel)
                 
-                # Write the chunk data to Excel
-                for _, row in df.iterrows():
-                    # Check if we've reached Excel's row limit
-                    if total_rows >= get_excel_row_limit():
-                        export_logger.warning(f"[{operation_id}] Reached Excel row limit. Stopping at {get_excel_row_limit()} rows.")
-                        break
-                        
-                    # Check for cancellation periodically 
-                    if row_idx % 1000 == 0 and is_operation_cancelled(operation_id):
-                        export_logger.info(f"[{operation_id}] Operation cancelled during Excel data writing at row {row_idx}/{total_count}")
-                        cleanup_on_error(workbook, file_path)
-                        raise Exception("Operation cancelled by user")
-                        
-                    for col_idx, value in enumerate(row):
-                        # Apply format during writing
-                        cell_format_to_use = date_format if col_idx == 2 and value else data_format
-                        worksheet.write(row_idx, col_idx, value, cell_format_to_use)
-                        
-                        # Update max width for the column
-                        # Handle None values and ensure comparison is based on string length
-                        cell_content_length = len(str(value)) if value is not None else 0
-                        max_widths[col_idx] = max(max_widths[col_idx], cell_content_length)
-                        
-                    row_idx += 1
-                    total_rows += 1
+                # Trim the chunk to the Excel row limit up front instead of checking every row;
+                # cancellation is checked once per chunk above
+                if total_rows + chunk_size_actual > row_limit:
+                    export_logger.warning(f"[{operation_id}] Reached Excel row limit. Stopping at {row_limit} rows.")
+                    df = df.iloc[:row_limit - total_rows]
+                
+                # Null text must reach the worksheet as None (a blank cell), not NaN
+                df = _blank_text_nulls(df)
+                
+                # Measure column widths from the leading rows only, a column at a time
+                if total_rows < _WIDTH_SAMPLE_ROWS:
+                    sample_widths = column_text_widths(df.iloc[:_WIDTH_SAMPLE_ROWS - total_rows])
+                    max_widths = np.maximum(max_widths, sample_widths).tolist()
+                
+                if workbook.constant_memory:
+                    # Pick each column's typed writer once per chunk from its dtype, so cells skip
+                    # xlsxwriter's generic write() type checks
+                    writers, formats = frame_column_writers(worksheet, df.dtypes, data_format, date_format)
+                    
+                    # Streaming mode only accepts rows in order: plain tuples avoid building a Series per row
+                    for row in df.itertuples(index=False, name=None):
+                        for col_idx, value in enumerate(row):
+                            writers[col_idx](row_idx, col_idx, value, formats[col_idx])
+                            
+                        row_idx += 1
+                        total_rows += 1
+                else:
+                    # In-memory workbook: write the chunk a column at a time, one call per column
+                    for col_idx in range(df.shape[1]):
+                        column_format = date_format if col_idx == 2 else data_format
+                        worksheet.write_column(row_idx, col_idx, df.iloc[:, col_idx].tolist(), column_format)
+                    row_idx += len(df)
+                    total_rows += len(df)
                 
                 # Calculate chunk processing time
-                chunk_time = (datetime.now() - chunk_start).total_seconds()
+                chunk_time = time.perf_counter() - chunk_start
                 
                 # Update operation progress in the tracker directly with accumulated total
                 update_operation_progress(operation_id, total_rows, total_count)
                 
                 # Check if we've reached Excel's row limit
-                if total_rows >= get_excel_row_limit():
+                if total_rows >= row_limit:
                     break
                 
                 # Log the current chunk progress with accumulated totals
+                progress_pct = min(100, int((total_rows / total_count) * 100))
                 export_logger.info(
-                    f"[{operation_id}] Processed chunk {chunk_num} of {chunk_size_actual} rows in {chunk_time:.2f} seconds. Total: {total_rows}/{total_count} ({min(100, int((total_rows / total_count) * 100))}%)",
+                    f"[{operation_id}] Processed chunk {chunk_num} of {chunk_size_actual} rows in {chunk_time:.2f} seconds. Total: {total_rows}/{total_count} ({progress_pct}%)",
                     extra={
                         "operation_id": operation_id,
                         "chunk_num": chunk_num,
@@ -303,17 +447,13 @@ def generate_excel(params):
                         "chunk_time": chunk_time,
                         "total_rows": total_rows,
                         "total_count": total_count,
-                        "progress_pct": min(100, int((total_rows / total_count) * 100))
+                        "progress_pct": progress_pct
                     }
                 )
             
             # --- Formatting applied AFTER data writing ---
             export_logger.info(f"[{operation_id}] Applying column formats and auto-fitting columns...")
             for col_idx, width in enumerate(max_widths):
-                # Determine the correct format for the column
-                # Use date format for column 3 (index 2)
-                cell_format = date_format if col_idx == 2 else data_format
-                
                 # Calculate final width with padding and minimum width
                 final_width = max(min_width, width + padding)
                 
@@ -336,10 +476,9 @@ def generate_excel(params):
             mark_operation_completed(operation_id)
             
             # Return both the file path and the operation ID
-            return file_path, operation_id
+            return ExportResult(operation_id, path=file_path)
     except Exception as e:
         log_excel_error(operation_id, e)
-        import traceback
         print(traceback.format_exc())
         
         # Clean up partial file if it exists
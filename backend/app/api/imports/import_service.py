@@ -6,17 +6,12 @@ from datetime import datetime
 import tempfile
 import uuid
 import pathlib
-import gc
+import time
 import os
 import threading
 from typing import List, Dict, Any
 
-# Month names mapping for dynamic month code generation
-month_names = {
-    "01": "JAN", "02": "FEB", "03": "MAR", "04": "APR", 
-    "05": "MAY", "06": "JUN", "07": "JUL", "08": "AUG", 
-    "09": "SEP", "10": "OCT", "11": "NOV", "12": "DEC"
-}
+from ..exports.excel_utils import month_abbr
 
 def get_month_code(year_month):
     """
@@ -38,7 +33,7 @@ def get_month_code(year_month):
         year = year_month_str[2:4]   # 3rd and 4th digits are the year (YY part of YYYY)
         
         # Get month name and combine with year
-        month_name = month_names.get(month, "UNK")
+        month_name = month_abbr(month, "UNK")
         return f"{month_name}{year}"
     else:
         # Handle invalid format gracefully
@@ -56,9 +51,8 @@ from ..core.logging_utils import log_excel_completion, log_excel_error
 from ..database_operations.import_database import (
     execute_import_procedure,
     get_preview_data_import,
-    get_first_row_hs_code_import,
-    get_column_headers_import,
-    get_total_row_count_import,
+    get_import_metadata,
+    get_import_view_columns,
     fetch_data_in_chunks_import
 )
 from ..core.logging_utils import (
@@ -72,7 +66,8 @@ from ..core.logging_utils import (
 )
 from ..core.data_processing import (
     CustomJSONEncoder,
-    process_dataframe_for_json
+    process_dataframe_for_json,
+    column_text_widths
 )
 from ..exports.excel_utils import (
     setup_excel_workbook,
@@ -88,6 +83,21 @@ from ..core.operation_tracker import (
     get_operation_details
 )
 
+# Positions of the date and numeric columns in the full import view
+_DATE_POSITIONS = (1,)
+_NUMERIC_POSITIONS = (16, 17, 19, 20, 21, 23, 28)
+
+# Positions of the long text columns, whose widths are capped at 50 characters
+_TEXT_POSITIONS = (0, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 22, 24, 25, 26, 27, 29, 30, 31)
+
+def _column_flags(view_columns, headers, positions):
+    """Flag each header that names a column at one of the given full-view positions
+
+    Columns are matched by name, so a projected IMPORT_COLUMNS list keeps each column's type.
+    """
+    names = frozenset(view_columns[i] for i in positions if i < len(view_columns))
+    return [header in names for header in headers]
+
 # Constants - now configurable through settings
 def get_excel_row_limit():
     """Get Excel row limit from configuration"""
@@ -142,15 +152,13 @@ def preview_data(params):
             # Check for cancellation after procedure execution
             if is_operation_cancelled(operation_id):
                 import_logger.info(f"[{operation_id}] Preview operation cancelled after procedure execution")
-                raise Exception("Operation cancelled by user")            # Get the total row count
-            total_count = get_total_row_count_import(conn, params, operation_id)# Get preview data (limited to configurable sample size from settings.PREVIEW_SAMPLE_SIZE)
-            preview_data_df = get_preview_data_import(conn, params, operation_id)
+                raise Exception("Operation cancelled by user")
             
-            # Get column headers
-            headers = get_column_headers_import(conn, params, operation_id)
+            # Get the total row count, column headers and first row HS code in one round-trip
+            total_count, headers, first_row_hs = get_import_metadata(conn, params, operation_id)
             
-            # Get first row HS code for filename generation
-            first_row_hs = get_first_row_hs_code_import(conn, params, operation_id)
+            # Get preview data (limited to configurable sample size from settings.PREVIEW_SAMPLE_SIZE)
+            preview_data_df = get_preview_data_import(conn, params, operation_id)
             
             # Process the dataframe for JSON serialization
             preview_data_json = process_dataframe_for_json(preview_data_df)
@@ -195,6 +203,9 @@ def generate_excel(params):
     try:
         start_time = datetime.now()
         
+        # Read the configured row limit once; it is consulted per chunk below
+        row_limit = get_excel_row_limit()
+        
         # Log the start of the Excel generation operation
         log_excel_start(operation_id, params)
         
@@ -214,8 +225,8 @@ def generate_excel(params):
                 import_logger.info(f"[{operation_id}] Excel generation cancelled after procedure execution")
                 raise Exception("Operation cancelled by user")
                 
-            # Get total row count - store this in operation_details for reuse
-            total_count = get_total_row_count_import(conn, params, operation_id)
+            # Get total row count, headers and first row HS code in one round-trip - store the count in operation_details for reuse
+            total_count, headers, first_row_hs = get_import_metadata(conn, params, operation_id)
             
             # Cache the total count in operation details to avoid repeated database calls
             operation_details = get_operation_details(operation_id)
@@ -229,8 +240,8 @@ def generate_excel(params):
             import_logger.info(f"📊 [{operation_id}] Total rows to import: {total_count}")
             
             # Check if count exceeds Excel row limit and handle accordingly
-            if total_count > get_excel_row_limit() and not params.force_continue_despite_limit:
-                import_logger.warning(f"📊 [{operation_id}] Record count ({total_count}) exceeds Excel row limit ({get_excel_row_limit()}). Import operation paused waiting for user confirmation")
+            if total_count > row_limit and not params.force_continue_despite_limit:
+                import_logger.warning(f"📊 [{operation_id}] Record count ({total_count}) exceeds Excel row limit ({row_limit}). Import operation paused waiting for user confirmation")
                 
                 # Mark operation as paused but not completed
                 if operation_details:
@@ -242,22 +253,19 @@ def generate_excel(params):
                 # Return a structured JSON response instead of raising an exception
                 return None, {
                     "status": "limit_exceeded",
-                    "message": f"Total records ({total_count}) exceed Excel row limit ({get_excel_row_limit()}).",
+                    "message": f"Total records ({total_count}) exceed Excel row limit ({row_limit}).",
                     "operation_id": operation_id,
                     "total_records": total_count,
-                    "limit": get_excel_row_limit()                }
+                    "limit": row_limit                }
             else:
                 # User has confirmed to continue, so we'll limit to Excel max rows
-                if total_count > get_excel_row_limit():
-                    import_logger.warning(f"📊 [{operation_id}] Record count ({total_count}) exceeds Excel row limit. Processing only first {get_excel_row_limit()} rows as per user confirmation")
+                if total_count > row_limit:
+                    import_logger.warning(f"📊 [{operation_id}] Record count ({total_count}) exceeds Excel row limit. Processing only first {row_limit} rows as per user confirmation")
                     
                     # Store the actual row limit for use in data processing
                     if operation_details:
                         with _operations_lock:
-                            operation_details["max_rows"] = get_excel_row_limit()
-              # Get first row HS code for filename generation
-            first_row_hs = get_first_row_hs_code_import(conn, params, operation_id)
-            
+                            operation_details["max_rows"] = row_limit
             # Create a filename based on the parameters
             filename = create_filename_import(params, first_row_hs)
             
@@ -265,16 +273,13 @@ def generate_excel(params):
             file_path = os.path.join(settings.TEMP_DIR, filename)
             
             # Set up the Excel workbook
-            workbook = setup_excel_workbook(file_path)
+            workbook = setup_excel_workbook(file_path, min(total_count, row_limit), len(headers))
             
             # Create Excel formats - returns (header_format, data_format, date_format)
             header_format, data_format, date_format = create_excel_formats(workbook)
             
             # Add a worksheet
             worksheet = workbook.add_worksheet("Import Data")
-              # Get column headers
-            headers = get_column_headers_import(conn, params, operation_id)
-            
             # Write headers to the worksheet
             write_excel_headers(worksheet, headers, header_format)
             
@@ -284,12 +289,20 @@ def generate_excel(params):
             max_widths = [len(header) for header in headers]  # Track maximum width for each column
             padding = 2  # Extra padding for column width
             min_width = 8  # Minimum column width
+            
+            # Per-column type flags for the fetched headers, built once for the cell loop
+            selected_view = settings.IMPORT_VIEWS.get(params.selectedView or "IMPORT_VIEW_1", {}).get("value", settings.IMPORT_VIEW)
+            view_columns = get_import_view_columns(conn, selected_view)
+            is_date_column = _column_flags(view_columns, headers, _DATE_POSITIONS)
+            is_numeric_column = _column_flags(view_columns, headers, _NUMERIC_POSITIONS)
+            is_text_column = _column_flags(view_columns, headers, _TEXT_POSITIONS)
+            numeric_indexes = [col_idx for col_idx, is_numeric in enumerate(is_numeric_column) if is_numeric]
               # Use configurable batch size from settings instead of hardcoded value
             chunk_size = settings.get_batch_size('import')  # Uses optimized batch size for import module
             
             # Set the batch size for the generator function
             # This will be used inside fetch_data_in_chunks_import
-            total_row_count_to_process = min(total_count, get_excel_row_limit())
+            total_row_count_to_process = min(total_count, row_limit)
             
             # Add a counter to track rows we've processed
             processed_row_count = 0
@@ -301,31 +314,43 @@ def generate_excel(params):
                     import_logger.warning(f"[{operation_id}] Excel generation cancelled by user during chunk processing")
                     raise Exception("Operation cancelled by user")
                 
-                chunk_start = datetime.now()
+                chunk_start = time.perf_counter()
                 chunk_size_actual = len(chunk_df)
                 
                 # Process each row in the chunk more efficiently, but limit to the Excel row limit
                 if chunk_size_actual > 0:
                     # First check if we need to process this chunk at all
-                    if processed_row_count >= get_excel_row_limit():
-                        import_logger.warning(f"[{operation_id}] Reached Excel row limit of {get_excel_row_limit()}. Stopping processing.")
+                    if processed_row_count >= row_limit:
+                        import_logger.warning(f"[{operation_id}] Reached Excel row limit of {row_limit}. Stopping processing.")
                         break
                     
                     # Calculate how many rows we can actually process from this chunk
-                    rows_left_to_process = get_excel_row_limit() - processed_row_count
+                    rows_left_to_process = row_limit - processed_row_count
                     rows_to_process = min(chunk_size_actual, rows_left_to_process)
                     
                     # If we'll hit the limit within this chunk, log it
                     if rows_to_process < chunk_size_actual:
                         import_logger.warning(f"[{operation_id}] Will reach Excel limit during this chunk. Processing only {rows_to_process} of {chunk_size_actual} rows.")
                     
+                    # Type numeric text once per column here, so the cell loop below only checks
+                    # value types; values that do not parse as numbers keep their original text
+                    for col_idx in numeric_indexes:
+                        # Text arrives as object, or as pandas' str dtype under pandas 3
+                        dtype = chunk_df.dtypes.iloc[col_idx]
+                        if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+                            # As object, so parsed numbers and unparsed text can share the column
+                            column = chunk_df.iloc[:, col_idx].astype(object)
+                            converted = pd.to_numeric(column, errors="coerce")
+                            chunk_df[chunk_df.columns[col_idx]] = converted.where(converted.notna(), column)
+                    
+                    # Measure column widths from the first 1000 rows, a column at a time
+                    if total_rows < 1000:
+                        sample_widths = column_text_widths(chunk_df.iloc[:min(rows_to_process, 1000 - total_rows)])
+                        max_widths = np.maximum(max_widths, sample_widths).tolist()
+                    
                     # Get the values as a numpy array for faster access
                     values = chunk_df.values[:rows_to_process]
                     
-                    # Prepare column metadata for optimization
-                    date_columns = [1]  # Indices of date columns
-                    numeric_columns = [16, 17, 19, 20, 21, 23, 28]  # Indices of numeric columns
-                    
                     # Pre-allocate max_widths tracking for string columns
                     # Process the data in bulk using more efficient methods
                     for idx, row in enumerate(values):
@@ -335,9 +360,9 @@ def generate_excel(params):
                             # Apply optimized write methods based on column type
                             if pd.isna(value) or value is None:
                                 worksheet.write_blank(excel_row, col_idx, None, data_format)
-                            elif col_idx in date_columns and isinstance(value, (datetime, pd.Timestamp)):
+                            elif is_date_column[col_idx] and isinstance(value, (datetime, pd.Timestamp)):
                                 worksheet.write_datetime(excel_row, col_idx, value, date_format)
-                            elif col_idx in numeric_columns and (isinstance(value, (int, float)) or (isinstance(value, str) and value.replace('.', '', 1).isdigit())):
+                            elif is_numeric_column[col_idx] and isinstance(value, (int, float)):
                                 # Use fast number writing for numeric columns
                                 try:
                                     worksheet.write_number(excel_row, col_idx, float(value) if value is not None else 0, data_format)
@@ -346,11 +371,7 @@ def generate_excel(params):
                                     worksheet.write_string(excel_row, col_idx, str(value), data_format)
                             else:
                                 # String handling
-                                str_value = str(value)
-                                worksheet.write_string(excel_row, col_idx, str_value, data_format)
-                                # Only track width for first 1000 rows to improve performance
-                                if total_rows < 1000:
-                                    max_widths[col_idx] = max(max_widths[col_idx], len(str_value))
+                                worksheet.write_string(excel_row, col_idx, str(value), data_format)
                         
                         row_idx += 1
                         total_rows += 1
@@ -360,13 +381,13 @@ def generate_excel(params):
                     values = None
                 
                 # Calculate chunk processing time
-                chunk_time = (datetime.now() - chunk_start).total_seconds()
+                chunk_time = time.perf_counter() - chunk_start
                 
                 # Update operation progress in the tracker
                 update_operation_progress(operation_id, total_rows, total_row_count_to_process)
                   # Check if we've reached Excel's row limit - we do this at the batch level too
-                if processed_row_count >= get_excel_row_limit():
-                    import_logger.warning(f"[{operation_id}] Reached Excel row limit. Stopping at {get_excel_row_limit()} rows.")
+                if processed_row_count >= row_limit:
+                    import_logger.warning(f"[{operation_id}] Reached Excel row limit. Stopping at {row_limit} rows.")
                     break
                 
                 # Log chunk progress for monitoring
@@ -375,9 +396,8 @@ def generate_excel(params):
                     f"[{operation_id}] Processed chunk {chunk_idx} of {chunk_size_actual} rows in {chunk_time:.2f} seconds. Total: {total_rows}/{total_row_count_to_process} ({progress_pct}%)"
                 )
                 
-                # Force garbage collection after each chunk
+                # Release the chunk; reference counting frees it without a forced collection
                 chunk_df = None
-                gc.collect()
             
             # Set column widths more efficiently based on tracked max widths
             import_logger.info(f"[{operation_id}] Applying column formats and auto-fitting columns...")
@@ -388,13 +408,13 @@ def generate_excel(params):
             for col_idx, width in enumerate(max_widths):
                 # Apply column-specific formatting based on column type
                 # For date column
-                if col_idx == 1:  # Date column
+                if is_date_column[col_idx]:
                     col_width = 12  # Fixed width for dates
                 # For numeric columns 
-                elif col_idx in [16, 17, 19, 20, 21, 23, 28]:
+                elif is_numeric_column[col_idx]:
                     col_width = max(width + padding, 12)  # Minimum 12 for numeric columns
                 # For text columns that typically have longer content
-                elif col_idx in [0, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 22, 24, 25, 26, 27, 29, 30, 31]:
+                elif is_text_column[col_idx]:
                     col_width = min(max(width + padding, 12), 50)  # Min 12, max 50 chars
                 # Default for any other columns
                 else:
@@ -429,7 +449,7 @@ def generate_excel(params):
             execution_time = (datetime.now() - start_time).total_seconds()
             
             # Use the actual number of rows processed which is limited to Excel row limit
-            final_row_count = min(processed_row_count, get_excel_row_limit())
+            final_row_count = min(processed_row_count, row_limit)
             
             # IMPORTANT: Pass parameters in the correct order to prevent 500 errors
             # Correct order: (operation_id, file_path, total_rows, execution_time)
@@ -1,6 +1,6 @@
 from fastapi import FastAPI, Depends, HTTPException, status, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from typing import List, Optional
 import os
 import json
@@ -12,6 +12,11 @@ import time
 import base64
 import logging
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; responses then go through FastAPI's default encoding
+    orjson = None
+
 # Import your existing modules
 from .api.core.database import get_db_connection, test_connection
 from .api.core.models import ExportParameters, ImportParameters, PreviewResponse, LoginRequest
@@ -53,6 +58,13 @@ app.add_middleware(
 app.include_router(export_cancel_router, prefix="/api/exports", tags=["exports"])
 app.include_router(import_cancel_router, prefix="/api/imports", tags=["imports"])
 
+def preview_response(content):
+    """Encode a preview payload with orjson when installed, skipping FastAPI's per-value jsonable_encoder pass"""
+    if orjson is None:
+        return content
+    payload = orjson.dumps(content, default=CustomJSONEncoder().default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return Response(content=payload, media_type="application/json")
+
 # Universal token functions
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """
@@ -235,7 +247,7 @@ async def export_preview(params: ExportParameters):
         # Call the preview function
         preview_result = preview_data(params)
         
-        return preview_result
+        return preview_response(preview_result)
     except Exception as e:
         logger.error(f"Error in export preview: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error generating preview: {str(e)}")
@@ -255,10 +267,22 @@ async def export_excel(params: ExportParameters):
         logger.info(f"Export excel request received with parameters: {masked_params}")
         
         # Call the export function
-        file_path, operation_id = generate_excel(params)
+        result = generate_excel(params)
+        
+        # Over the Excel row limit without confirmation: tell the frontend instead of sending a file
+        if result.limit_exceeded:
+            return JSONResponse(content=result.limit_info)
+        
+        file_path, operation_id = result.path, result.operation_id
         
         # Return the file as a download
         filename = os.path.basename(file_path)
+        if filename.endswith(".parquet"):
+            media_type = "application/vnd.apache.parquet"
+        elif filename.endswith(".csv.gz"):
+            media_type = "application/gzip"
+        else:
+            media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         
         def iterfile():
             with open(file_path, mode="rb") as file_like:
@@ -279,7 +303,7 @@ async def export_excel(params: ExportParameters):
         
         return StreamingResponse(
             iterfile(),
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            media_type=media_type,
             headers=headers
         )
     except Exception as e:
@@ -298,7 +322,7 @@ async def import_preview(params: ImportParameters):
         # Call the preview function
         preview_result = preview_data_import(params)
         
-        return preview_result
+        return preview_response(preview_result)
     except Exception as e:
         logger.error(f"Error in import preview: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error generating import preview: {str(e)}")
@@ -0,0 +1,4 @@
+import os
+
+# Settings are read at import time and require a driver name; tests never open a real connection
+os.environ.setdefault("DB_DRIVER", "ODBC Driver 17 for SQL Server")
@@ -0,0 +1,76 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from app.api.database_operations.export_database import _rows_to_dataframe
+from app.api.exports.excel_utils import create_excel_formats, frame_column_writers, setup_excel_workbook
+from app.api.exports.export_service import _blank_text_nulls
+
+openpyxl = pytest.importorskip("openpyxl")
+
+COLUMNS = ["Hs_Code", "Qty", "SB_Date", "Port"]
+ROWS = [
+    ("0101", 12.5, datetime(2024, 1, 31), "NHAVA SHEVA"),
+    ("0102", None, datetime(2024, 2, 29), None),
+]
+
+
+def test_rows_to_dataframe_types_columns():
+    df = _rows_to_dataframe(ROWS, COLUMNS)
+
+    assert list(df.columns) == COLUMNS
+    assert df["Qty"].dtype.kind == "f"
+    assert df["SB_Date"].dtype.kind == "M"
+    assert df["Port"].isna().tolist() == [False, True]
+
+
+def test_rows_to_dataframe_falls_back_for_mixed_values():
+    df = _rows_to_dataframe([("0101", Decimal("1.5")), ("0102", "n/a")], ["Hs_Code", "Value"])
+
+    assert df["Value"].tolist() == [Decimal("1.5"), "n/a"]
+
+
+def test_rows_to_dataframe_keeps_columns_when_empty():
+    df = _rows_to_dataframe([], COLUMNS)
+
+    assert df.empty
+    assert list(df.columns) == COLUMNS
+
+
+def test_blank_text_nulls_only_touches_text_columns():
+    df = _blank_text_nulls(_rows_to_dataframe(ROWS, COLUMNS))
+
+    assert df["Port"].tolist() == ["NHAVA SHEVA", None]
+    assert df["Qty"].dtype.kind == "f"
+
+
+def test_typed_writers_produce_native_cells(tmp_path):
+    df = _blank_text_nulls(_rows_to_dataframe(ROWS, COLUMNS))
+    path = str(tmp_path / "typed.xlsx")
+
+    workbook = setup_excel_workbook(path)
+    assert workbook.constant_memory
+    worksheet = workbook.add_worksheet("Export Data")
+    _, data_format, date_format = create_excel_formats(workbook)
+
+    writers, formats = frame_column_writers(worksheet, df.dtypes, data_format, date_format)
+    assert writers[1] == worksheet.write_number
+    assert writers[2] == worksheet.write_datetime
+    assert writers[0] == worksheet.write
+    assert formats[2] is date_format
+
+    for row_idx, row in enumerate(df.itertuples(index=False, name=None), 1):
+        for col_idx, value in enumerate(row):
+            writers[col_idx](row_idx, col_idx, value, formats[col_idx])
+    workbook.close()
+
+    sheet = openpyxl.load_workbook(path).active
+    # Row 1 is the header row; data starts at row 2
+    assert sheet["A2"].value == "0101"
+    assert sheet["B2"].value == 12.5
+    assert sheet["C2"].value == datetime(2024, 1, 31)
+    assert sheet["C3"].value == datetime(2024, 2, 29)
+    # NaN becomes an Excel error cell (nan_inf_to_errors); None is left blank
+    assert sheet["B3"].value == "=#NUM!"
+    assert sheet["D3"].value is None
@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.api.database_operations import import_database
+from app.api.database_operations.import_database import (
+    _select_list,
+    get_import_metadata,
+    get_import_view_columns,
+)
+
+VIEW_COLUMNS = ["Hs_Code", "DATE", "Product", "Qty"]
+
+
+class ViewCursor:
+    """Cursor stand-in for an import view; TOP 0 * reports every column, other queries the projection"""
+
+    def __init__(self, projection):
+        self.projection = projection
+
+    def execute(self, query):
+        columns = VIEW_COLUMNS if query.startswith("SELECT TOP 0 *") else self.projection
+        self.description = [(column,) for column in columns]
+        self.rows = [tuple(f"{column}-1" for column in columns)]
+        return self
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def nextset(self):
+        self.rows = [(42,)]
+        return True
+
+    def close(self):
+        pass
+
+
+class ViewConnection:
+    def __init__(self, projection=VIEW_COLUMNS):
+        self.projection = projection
+
+    def cursor(self):
+        return ViewCursor(self.projection)
+
+
+@pytest.fixture(autouse=True)
+def fresh_view_columns(monkeypatch):
+    monkeypatch.setattr(import_database, "_view_columns", {})
+    monkeypatch.setattr(import_database.settings, "IMPORT_VIEWS", {})
+    monkeypatch.setattr(import_database.settings, "IMPORT_VIEW", "ImportView")
+
+
+def test_select_list_projects_quoted_columns(monkeypatch):
+    monkeypatch.setattr(import_database, "DEFAULT_IMPORT_COLUMNS", [])
+    assert _select_list() == "*"
+    assert _select_list(["DATE", "Odd]Name"]) == "[DATE], [Odd]]Name]"
+
+
+def test_unknown_import_columns_are_rejected(monkeypatch):
+    monkeypatch.setattr(import_database, "DEFAULT_IMPORT_COLUMNS", ["DATE", "Missing"])
+
+    with pytest.raises(Exception, match="Missing"):
+        get_import_view_columns(ViewConnection(), "ImportView")
+
+
+def test_view_columns_are_cached_per_view(monkeypatch):
+    monkeypatch.setattr(import_database, "DEFAULT_IMPORT_COLUMNS", [])
+    conn = ViewConnection()
+
+    assert get_import_view_columns(conn, "ImportView") == VIEW_COLUMNS
+    conn.cursor = None  # a second lookup must not query the database
+    assert get_import_view_columns(conn, "ImportView") == VIEW_COLUMNS
+
+
+def test_metadata_takes_hs_code_by_name_from_projection(monkeypatch):
+    projection = ["DATE", "Qty", "Hs_Code"]
+    monkeypatch.setattr(import_database, "DEFAULT_IMPORT_COLUMNS", projection)
+    params = SimpleNamespace(selectedView=None)
+
+    count, headers, first_row_hs = get_import_metadata(ViewConnection(projection), params, "import-projection")
+
+    assert count == 42
+    assert headers == projection
+    assert first_row_hs == ["Hs_Code-1"]
+
+
+def test_metadata_without_hs_code_column(monkeypatch):
+    projection = ["DATE", "Qty"]
+    monkeypatch.setattr(import_database, "DEFAULT_IMPORT_COLUMNS", projection)
+    params = SimpleNamespace(selectedView=None)
+
+    _, headers, first_row_hs = get_import_metadata(ViewConnection(projection), params, "import-no-hs")
+
+    assert headers == projection
+    assert first_row_hs == [None]
+
+
+def test_column_flags_follow_names_through_a_projection():
+    from app.api.imports.import_service import _column_flags
+
+    view_columns = ["Hs_Code", "DATE", "Product", "Qty"]
+    headers = ["Qty", "DATE", "Hs_Code"]
+
+    assert _column_flags(view_columns, headers, (1,)) == [False, True, False]
+    assert _column_flags(view_columns, headers, (3,)) == [True, False, False]
+    # Positions beyond a narrower view are ignored
+    assert _column_flags(view_columns, headers, (0, 28)) == [False, False, True]
@@ -0,0 +1,66 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from app.api.imports import import_service
+
+openpyxl = pytest.importorskip("openpyxl")
+
+VIEW_COLUMNS = ["Hs_Code", "DATE", "Qty"]
+
+
+@pytest.fixture
+def fake_import(tmp_path, monkeypatch):
+    """Run generate_excel against a fixed chunk instead of the database"""
+
+    def run(chunk):
+        @contextmanager
+        def fake_connection(*args):
+            yield object()
+
+        def fake_chunks(conn, params, operation_id, batch_size=None, columns=None):
+            yield chunk
+
+        monkeypatch.setattr(import_service.settings, "TEMP_DIR", str(tmp_path))
+        monkeypatch.setattr(import_service, "_NUMERIC_POSITIONS", (2,))
+        monkeypatch.setattr(import_service, "get_db_connection", fake_connection)
+        monkeypatch.setattr(import_service, "execute_import_procedure", lambda conn, params, op: (len(chunk), False))
+        monkeypatch.setattr(
+            import_service, "get_import_metadata",
+            lambda conn, params, op: (len(chunk), list(chunk.columns), [chunk.iat[0, 0]])
+        )
+        monkeypatch.setattr(import_service, "get_import_view_columns", lambda conn, view: VIEW_COLUMNS)
+        monkeypatch.setattr(import_service, "fetch_data_in_chunks_import", fake_chunks)
+
+        params = SimpleNamespace(
+            server="s", database="d", username="u", password="p",
+            fromMonth=202401, toMonth=202401, hs="", prod="", iec="", impCmp="",
+            forcount="", forname="", port="", selectedView=None, force_continue_despite_limit=False,
+        )
+        file_path, _ = import_service.generate_excel(params)
+        return openpyxl.load_workbook(file_path).active
+
+    return run
+
+
+# None lets pandas infer the text dtype (object, or str under pandas 3)
+@pytest.mark.parametrize("dtype", [None, object, "string"])
+def test_numeric_text_is_written_as_numbers(fake_import, dtype):
+    chunk = pd.DataFrame({
+        "Hs_Code": ["0101", "0102", "0103"],
+        "DATE": pd.to_datetime(["2024-01-05", "2024-01-06", "2024-01-07"]),
+        "Qty": pd.Series(["12.5", "abc", "7"], dtype=dtype),
+    })
+
+    sheet = fake_import(chunk)
+
+    assert sheet["C2"].data_type == "n"
+    assert sheet["C2"].value == 12.5
+    assert sheet["C4"].value == 7
+    # Values that do not parse as numbers keep their text
+    assert sheet["C3"].data_type == "s"
+    assert sheet["C3"].value == "abc"
+    # Non-numeric columns stay text
+    assert sheet["A2"].data_type == "s"
@@ -0,0 +1,18 @@
+import pytest
+from pydantic import ValidationError
+
+from app.api.core.models import ExportParameters
+
+CONNECTION = dict(server="s", database="d", username="u", password="p", fromMonth=202401, toMonth=202401)
+
+
+@pytest.mark.parametrize("export_format", ["xlsx", "parquet", "csv"])
+def test_export_format_accepts_known_formats(export_format):
+    assert ExportParameters(**CONNECTION, export_format=export_format).export_format == export_format
+
+
+@pytest.mark.parametrize("export_format", ["Parquet", "CSV", "json"])
+def test_export_format_rejects_unknown_formats(export_format):
+    # Rejected values used to fall through to an xlsx export with its row limit
+    with pytest.raises(ValidationError):
+        ExportParameters(**CONNECTION, export_format=export_format)
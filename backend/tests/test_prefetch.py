@@ -0,0 +1,86 @@
+import threading
+
+from app.api.core.database import start_row_prefetch
+from app.api.core.operation_tracker import register_operation
+from app.api.database_operations.export_database import fetch_data_in_chunks_export
+
+
+class EndlessCursor:
+    """Cursor stand-in that always has more rows, so only a shutdown can end a fetch"""
+
+    description = [("Hs_Code",), ("Qty",)]
+
+    def __init__(self):
+        self.arraysize = 1
+        self.closed = False
+        self.fetching_after_close = False
+
+    def execute(self, query):
+        self.query = query
+        return self
+
+    def fetchone(self):
+        # Row count for the COUNT(*) fallback
+        return (1_000_000,)
+
+    def fetchmany(self, size):
+        if self.closed:
+            self.fetching_after_close = True
+        return [("0101", i) for i in range(size)]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self):
+        self.cursors = []
+
+    def cursor(self):
+        cursor = EndlessCursor()
+        self.cursors.append(cursor)
+        return cursor
+
+
+def test_prefetch_thread_stops_while_queue_is_full():
+    register_operation("prefetch-stop")
+    cursor = EndlessCursor()
+    rows_queue, stop_event, thread = start_row_prefetch(cursor, "prefetch-stop", 10)
+
+    assert len(rows_queue.get(timeout=5)) == 10
+
+    # The producer is now blocked on a full queue; stopping must release it
+    stop_event.set()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+
+
+def test_prefetch_thread_reports_fetch_errors():
+    class FailingCursor(EndlessCursor):
+        def fetchmany(self, size):
+            raise RuntimeError("connection lost")
+
+    register_operation("prefetch-error")
+    rows_queue, stop_event, thread = start_row_prefetch(FailingCursor(), "prefetch-error", 10)
+
+    error = rows_queue.get(timeout=5)
+    assert isinstance(error, RuntimeError)
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+
+
+def test_closing_export_chunks_stops_prefetch_before_cursor_close():
+    register_operation("chunks-close")
+    conn = FakeConnection()
+    chunks = fetch_data_in_chunks_export(conn, "chunks-close", batch_size=100)
+
+    first_chunk = next(chunks)
+    assert list(first_chunk.columns) == ["Hs_Code", "Qty"]
+    assert len(first_chunk) == 100
+
+    # Closing early (row limit, cancel, error) must shut the fetch thread down and close the cursor
+    chunks.close()
+    data_cursor = conn.cursors[-1]
+    assert data_cursor.closed
+    assert not data_cursor.fetching_after_close
+    assert not any(t.name == "prefetch-chunks-close" for t in threading.enumerate())
@@ -0,0 +1,52 @@
+import json
+import math
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+
+from app.api.core.data_processing import CustomJSONEncoder, process_dataframe_for_json
+from app.main import preview_response
+
+
+def _decode(response):
+    # Without orjson the payload is returned unencoded for FastAPI to serialize
+    if isinstance(response, list):
+        return json.loads(json.dumps(response, cls=CustomJSONEncoder))
+    return json.loads(response.body)
+
+
+def test_preview_encodes_decimal_column():
+    df = pd.DataFrame({"Hs_Code": ["0101", "0102"], "Value": [Decimal("1.50"), Decimal("20.25")]})
+
+    records = _decode(preview_response(process_dataframe_for_json(df)))
+
+    assert records == [{"Hs_Code": "0101", "Value": 1.5}, {"Hs_Code": "0102", "Value": 20.25}]
+
+
+def test_preview_encodes_missing_values_as_null():
+    df = pd.DataFrame({
+        "Qty": [1.0, float("nan")],
+        "Value": [Decimal("3.10"), None],
+        "DATE": pd.to_datetime(["2024-01-31", None]),
+    })
+
+    records = _decode(preview_response(process_dataframe_for_json(df)))
+
+    assert records == [
+        {"Qty": 1.0, "Value": 3.1, "DATE": "2024-01-31T00:00:00"},
+        {"Qty": None, "Value": None, "DATE": None},
+    ]
+
+
+@pytest.mark.parametrize("value, expected", [
+    (Decimal("1.50"), 1.5),
+    (pd.Timestamp("2024-01-31 12:30"), "2024-01-31T12:30:00"),
+    (pd.NaT, None),
+])
+def test_custom_encoder_default(value, expected):
+    result = CustomJSONEncoder().default(value)
+    if isinstance(expected, float):
+        assert math.isclose(result, expected)
+    else:
+        assert result == expected
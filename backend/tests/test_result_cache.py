@@ -0,0 +1,38 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from app.api.core import result_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache.settings, "RESULT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(result_cache.settings, "RESULT_CACHE_TTL_SECONDS", 60)
+    return tmp_path
+
+
+def _spool(key, dates):
+    schema = pa.schema([("DATE", pa.string()), ("Qty", pa.int64())])
+    spool = result_cache.ResultSpool(key, schema)
+    spool.write(pa.record_batch([pa.array(dates), pa.array(range(len(dates)))], schema=schema))
+    spool.commit()
+    return result_cache.get_cached_result(key)
+
+
+def test_top_rows_keep_written_order(cache_dir):
+    path = _spool("order", ["2024-03", "2024-01", "2024-02"])
+
+    table = result_cache.read_top_rows(path, 2, batch_size=1)
+
+    assert table.column("DATE").to_pylist() == ["2024-03", "2024-01"]
+    assert result_cache.cached_row_count(path) == 3
+
+
+def test_aborted_spool_is_not_published(cache_dir):
+    schema = pa.schema([("DATE", pa.string())])
+    spool = result_cache.ResultSpool("aborted", schema)
+    spool.abort()
+
+    assert result_cache.get_cached_result("aborted") is None
+    assert list(cache_dir.iterdir()) == []